@@ -0,0 +1,717 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import database
+
+METRICS = ["attendance", "marks", "assignments", "study_hours", "extracurriculars"]
+GRADE_CODES = ["A", "B", "C", "D"]
+_DELETED = 255  # grade code marking a removed row until the next compaction
+SNAPSHOT_DIR = os.environ.get("STUDENT_TRACKER_SNAPSHOT_DIR", "snapshots")
+
+
+class StudentColumnStore:
+    """
+    In-memory copy of the students table as compact column arrays:
+    int32 id, five float32 metrics, uint8 grade code and an int32 code into a shared
+    name table, i.e. 29 bytes per student instead of a dict per row.
+    The table is loaded once; after that sync() applies only the INSERT/UPDATE/DELETE
+    deltas recorded in the student_changes log since the last sync.
+    Rows are kept sorted by id, so lookups are binary searches. Ids normally only grow
+    (AUTOINCREMENT) and new rows are appended; rows with explicit lower ids are inserted in place.
+    """
+
+    def __init__(self, shard: Optional[str] = None, initial_capacity: int = 1024):
+        self.shard = shard
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._name_codes: Dict[str, int] = {}
+        self._n = 0
+        self._deleted = 0
+        self._quiet = False
+        # Called as listener(old, new) with (metric values..., grade code) tuples, None for
+        # no row; and as listener(None, None) after a full reload
+        self._listeners: List[Callable[[Optional[tuple], Optional[tuple]], None]] = []
+        self._alloc(initial_capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        self.ids = np.zeros(capacity, dtype=np.int32)
+        self.metrics = {m: np.zeros(capacity, dtype=np.float32) for m in METRICS}
+        self.grade = np.zeros(capacity, dtype=np.uint8)
+        self.name = np.zeros(capacity, dtype=np.int32)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        old = (self.ids, self.metrics, self.grade, self.name)
+        self._alloc(new_capacity)
+        self.ids[: self._n] = old[0][: self._n]
+        for m in METRICS:
+            self.metrics[m][: self._n] = old[1][m][: self._n]
+        self.grade[: self._n] = old[2][: self._n]
+        self.name[: self._n] = old[3][: self._n]
+
+    def _name_code(self, name: str) -> int:
+        code = self._name_codes.get(name)
+        if code is None:
+            code = len(self._names)
+            self._names.append(name)
+            self._name_codes[name] = code
+        return code
+
+    def _find(self, student_id: int) -> int:
+        pos = int(np.searchsorted(self.ids[: self._n], student_id))
+        if pos < self._n and self.ids[pos] == student_id and self.grade[pos] != _DELETED:
+            return pos
+        return -1
+
+    def _append(self, rows: List[Dict[str, Any]]) -> None:
+        start = self._n
+        self._grow(start + len(rows))
+        end = start + len(rows)
+        self.ids[start:end] = [r["id"] for r in rows]
+        for m in METRICS:
+            self.metrics[m][start:end] = [r[m] for r in rows]
+        self.grade[start:end] = [GRADE_CODES.index(r["predicted_grade"]) for r in rows]
+        self.name[start:end] = [self._name_code(r["name"]) for r in rows]
+        self._n = end
+
+    def _insert(self, row: Dict[str, Any]) -> int:
+        pos = int(np.searchsorted(self.ids[: self._n], row["id"]))
+        if pos < self._n and self.ids[pos] == row["id"]:
+            self._deleted -= 1  # reuse the tombstone left by an earlier delete of this id
+        else:
+            self._grow(self._n + 1)
+            for arr in (self.ids, self.grade, self.name, *self.metrics.values()):
+                arr[pos + 1 : self._n + 1] = arr[pos : self._n]
+            self._n += 1
+        self.ids[pos] = row["id"]
+        for m in METRICS:
+            self.metrics[m][pos] = row[m]
+        self.grade[pos] = GRADE_CODES.index(row["predicted_grade"])
+        self.name[pos] = self._name_code(row["name"])
+        return pos
+
+    def _row(self, pos: int) -> tuple:
+        return tuple(float(self.metrics[m][pos]) for m in METRICS) + (int(self.grade[pos]),)
+
+    def _notify(self, old: Optional[tuple], new: Optional[tuple]) -> None:
+        if self._quiet:
+            return
+        for listener in self._listeners:
+            listener(old, new)
+
+    def add_listener(self, listener: Callable[[Optional[tuple], Optional[tuple]], None]) -> None:
+        # The initial listener(None, None) runs under the lock, so no change can slip in between
+        with self._lock:
+            listener(None, None)
+            self._listeners.append(listener)
+
+    def _upsert(self, row: Dict[str, Any]) -> None:
+        pos = self._find(row["student_id"])
+        if pos < 0:
+            record = {**row, "id": row["student_id"]}
+            if not self._n or row["student_id"] > self.ids[self._n - 1]:
+                self._append([record])
+                self._notify(None, self._row(self._n - 1))
+            else:
+                # Explicit ids below the newest one (split_database copying into a shard,
+                # a re-inserted id): place the row in id order
+                self._notify(None, self._row(self._insert(record)))
+            return
+        old = self._row(pos)
+        for m in METRICS:
+            self.metrics[m][pos] = row[m]
+        self.grade[pos] = GRADE_CODES.index(row["predicted_grade"])
+        self.name[pos] = self._name_code(row["name"])
+        new = self._row(pos)
+        if new != old:
+            self._notify(old, new)
+
+    def _delete(self, student_id: int) -> None:
+        pos = self._find(student_id)
+        if pos >= 0:
+            self._notify(self._row(pos), None)
+            self.grade[pos] = _DELETED
+            self._deleted += 1
+
+    def _compact(self) -> None:
+        live = self.grade[: self._n] != _DELETED
+        n = int(live.sum())
+        self.ids[:n] = self.ids[: self._n][live]
+        for m in METRICS:
+            self.metrics[m][:n] = self.metrics[m][: self._n][live]
+        self.grade[:n] = self.grade[: self._n][live]
+        self.name[:n] = self.name[: self._n][live]
+        self._n = n
+        self._deleted = 0
+
+    def _reload(self) -> None:
+        # Take the seq first: changes that race with the load are re-applied by sync (upserts are idempotent)
+        self.seq = database.get_change_seq(self.shard)
+        self._n = 0
+        self._deleted = 0
+        for rows in database.iter_student_chunks(50000, shard=self.shard):
+            self._append(rows)
+        self._notify(None, None)
+
+    def load(self) -> None:
+        with self._lock:
+            self._reload()
+            self._sync_locked()
+
+    def _sync_locked(self) -> int:
+        applied = 0
+        # Past this many changes in one sync (a regrade, an archive run), listeners get a
+        # single listener(None, None) to rebuild instead of one call per changed row
+        bulk_threshold = max(256, int(np.sqrt(self._n)))
+        try:
+            while True:
+                feed = database.changes_since(self.seq, shard=self.shard)
+                if feed["reset"]:
+                    self._reload()
+                    continue
+                if not self._quiet and applied + len(feed["changes"]) > bulk_threshold:
+                    self._quiet = True
+                for change in feed["changes"]:
+                    if change["op"] == "DELETE":
+                        self._delete(change["student_id"])
+                    else:
+                        self._upsert(change)
+                applied += len(feed["changes"])
+                self.seq = feed["last_seq"]
+                if not feed["changes"]:
+                    break
+            if self._deleted > max(1024, self._n // 4):
+                self._compact()
+        finally:
+            if self._quiet:
+                self._quiet = False
+                self._notify(None, None)
+        return applied
+
+    def sync(self) -> int:
+        """
+        Applies changes recorded since the last sync; returns how many were applied.
+        """
+        with self._lock:
+            return self._sync_locked()
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Returns a consistent copy of the live rows: id, the five metrics (float32),
+        grade_code (index into GRADE_CODES), name (object array) and name_code
+        (int32, equal for equal names).
+        """
+        with self._lock:
+            self._sync_locked()
+            live = self.grade[: self._n] != _DELETED
+            names = np.asarray(self._names, dtype=object)
+            cols: Dict[str, np.ndarray] = {"id": self.ids[: self._n][live]}
+            cols["name_code"] = self.name[: self._n][live]
+            cols["name"] = names[cols["name_code"]] if len(names) else np.empty(0, dtype=object)
+            for m in METRICS:
+                cols[m] = self.metrics[m][: self._n][live]
+            cols["grade_code"] = self.grade[: self._n][live]
+            return cols
+
+    def __len__(self) -> int:
+        return self._n - self._deleted
+
+    @property
+    def nbytes(self) -> int:
+        # Bytes held per stored row across all column arrays (excluding spare capacity and names)
+        per_row = self.ids.itemsize + sum(a.itemsize for a in self.metrics.values()) + self.grade.itemsize + self.name.itemsize
+        return per_row * len(self)
+
+
+_STORES: Dict[str, StudentColumnStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(shard: Optional[str] = None) -> StudentColumnStore:
+    """
+    Process-level store per database file, loaded on first use and synced on each read.
+    """
+    path = database.shard_path(shard)
+    store = _STORES.get(path)
+    if store is None:
+        with _STORES_LOCK:
+            store = _STORES.get(path)
+            if store is None:
+                store = StudentColumnStore(shard)
+                store.load()
+                _STORES[path] = store
+    return store
+
+
+# Cohort percentile ranking
+class SortedValues:
+    """
+    Sorted multiset of floats for rank queries: a sorted NumPy base array plus small
+    sorted buffers of recent additions and removals. count_below() is a binary search in
+    each, i.e. O(log n); the buffers are merged into the base once they outgrow sqrt(n),
+    so an insert costs O(sqrt n) amortized instead of an O(n) array shift every time.
+    """
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        self.base = np.sort(np.asarray(values if values is not None else [], dtype=np.float64))
+        self.added: List[float] = []
+        self.removed: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.added) - len(self.removed)
+
+    def add(self, value: float) -> None:
+        bisect.insort(self.added, value)
+        self._maybe_merge()
+
+    def remove(self, value: float) -> None:
+        bisect.insort(self.removed, value)
+        self._maybe_merge()
+
+    def count_below(self, value: float) -> int:
+        return (
+            int(np.searchsorted(self.base, value, side="left"))
+            + bisect.bisect_left(self.added, value)
+            - bisect.bisect_left(self.removed, value)
+        )
+
+    def count_at_or_below(self, value: float) -> int:
+        return (
+            int(np.searchsorted(self.base, value, side="right"))
+            + bisect.bisect_right(self.added, value)
+            - bisect.bisect_right(self.removed, value)
+        )
+
+    def percentile(self, value: float) -> float:
+        # Midpoint rank: ties count half, so a unique maximum of n values is 100 * (n - 0.5) / n
+        n = len(self)
+        if n == 0:
+            return 0.0
+        below = self.count_below(value)
+        equal = self.count_at_or_below(value) - below
+        return 100.0 * (below + 0.5 * equal) / n
+
+    def _maybe_merge(self) -> None:
+        if len(self.added) + len(self.removed) <= max(64, int(len(self.base) ** 0.5)):
+            return
+        merged = np.sort(np.concatenate([self.base, np.asarray(self.added, dtype=np.float64)]))
+        if self.removed:
+            values, counts = np.unique(np.asarray(self.removed, dtype=np.float64), return_counts=True)
+            first = np.searchsorted(merged, values, side="left")
+            # first occurrence of each removed value, plus one index per repeated removal
+            idx = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+            merged = np.delete(merged, idx)
+        self.base = merged
+        self.added = []
+        self.removed = []
+
+
+RANK_METRICS = METRICS + ["risk"]
+
+
+def _risk_of(rows: np.ndarray, grade_codes: np.ndarray) -> np.ndarray:
+    import backend  # imported here because backend imports this module
+
+    risk, _ = backend.compute_risk_batch(rows, np.eye(len(GRADE_CODES))[grade_codes])
+    return risk
+
+
+class CohortRanker:
+    """
+    Percentile of a student's inputs and risk score within all stored records.
+    Kept current by listening to the columnar store's row changes, so each submit
+    costs a few binary-search inserts rather than a table scan.
+    Risk uses the stored grade as a one-hot probability, like the Reports tab.
+    """
+
+    def __init__(self, store: StudentColumnStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._values: Dict[str, SortedValues] = {}
+        store.add_listener(self._on_change)  # builds the sorted arrays
+
+    def _rebuild(self) -> None:
+        live = self.store.grade[: self.store._n] != _DELETED
+        cols = {m: self.store.metrics[m][: self.store._n][live].astype(np.float64) for m in METRICS}
+        codes = self.store.grade[: self.store._n][live].astype(int)
+        X = np.column_stack([cols[m] for m in METRICS]) if len(codes) else np.empty((0, len(METRICS)))
+        cols["risk"] = _risk_of(X, codes)
+        with self._lock:
+            self._values = {m: SortedValues(cols[m]) for m in RANK_METRICS}
+
+    def _point(self, row: tuple) -> Dict[str, float]:
+        values = {m: row[i] for i, m in enumerate(METRICS)}
+        values["risk"] = float(_risk_of(np.array([row[: len(METRICS)]]), np.array([row[-1]]))[0])
+        return values
+
+    def _on_change(self, old: Optional[tuple], new: Optional[tuple]) -> None:
+        if old is None and new is None:
+            self._rebuild()
+            return
+        with self._lock:
+            if old is not None:
+                for m, v in self._point(old).items():
+                    self._values[m].remove(v)
+            if new is not None:
+                for m, v in self._point(new).items():
+                    self._values[m].add(v)
+
+    def percentiles(self, data: Dict[str, Any], grade: str) -> Dict[str, float]:
+        """
+        Percentile (0-100) of each input and of the risk score among stored records.
+        Values are compared at the store's float32 precision so a stored record ranks against itself exactly.
+        """
+        self.store.sync()
+        row = tuple(float(np.float32(data[m])) for m in METRICS) + (GRADE_CODES.index(grade),)
+        point = self._point(row)
+        with self._lock:
+            return {m: self._values[m].percentile(point[m]) for m in RANK_METRICS}
+
+
+_RANKERS: Dict[str, CohortRanker] = {}
+
+
+def get_ranker(shard: Optional[str] = None) -> CohortRanker:
+    path = database.shard_path(shard)
+    ranker = _RANKERS.get(path)
+    if ranker is None:
+        store = get_store(shard)
+        with _STORES_LOCK:
+            ranker = _RANKERS.get(path)
+            if ranker is None:
+                ranker = CohortRanker(store)
+                _RANKERS[path] = ranker
+    return ranker
+
+
+# Data quality: rule checks, robust outliers and duplicates over the whole table in one pass
+QUALITY_CHECKS: Dict[str, str] = {
+    "out_of_range": "A metric is outside its allowed range",
+    "attendance_without_study": "Near-perfect attendance with no study hours",
+    "marks_without_work": "High marks with almost no attendance or assignments",
+    "all_zero": "Every metric is zero",
+    "fractional_extracurriculars": "Extracurriculars is not a whole number",
+    "grade_mismatch": "Stored grade contradicts marks (A under 50% or D over 90%)",
+    "robust_outlier": "A metric is far from the cohort median (modified z-score)",
+    "isolation_outlier": "Unusual combination of metrics (isolation forest)",
+    "duplicate": "Same name and inputs as an earlier record",
+}
+ROBUST_Z_THRESHOLD = 3.5
+# Isolation-forest anomaly score (Liu et al.: 2 ** (-mean path length / c(n)), in (0, 1]).
+# Scores near 0.5 or below are normal. A fixed cut keeps clean data clean; a
+# contamination quota would flag its share of rows whatever the data looks like.
+ISOLATION_SCORE_THRESHOLD = 0.65
+ISOLATION_FIT_ROWS = 20000
+# Scoring costs one tree walk per row per tree; 50 trees keep 1M rows within a few seconds
+ISOLATION_TREES = 50
+
+
+def _rule_flags(X: np.ndarray, grade_codes: np.ndarray) -> Dict[str, np.ndarray]:
+    import backend  # imported here because backend imports this module
+
+    lo = np.array([backend.FEATURE_RANGES[m][0] for m in METRICS])
+    hi = np.array([backend.FEATURE_RANGES[m][1] for m in METRICS])
+    attendance, marks, assignments, study_hours, extracurriculars = X.T
+    return {
+        "out_of_range": ((X < lo) | (X > hi)).any(axis=1),
+        "attendance_without_study": (attendance >= 99) & (study_hours <= 0),
+        "marks_without_work": (marks >= 90) & ((attendance < 20) | (assignments < 10)),
+        "all_zero": ~X.any(axis=1),
+        "fractional_extracurriculars": extracurriculars != np.round(extracurriculars),
+        "grade_mismatch": ((grade_codes == 0) & (marks < 50)) | ((grade_codes == 3) & (marks > 90)),
+    }
+
+
+def _robust_z(X: np.ndarray) -> np.ndarray:
+    # Modified z-score (Iglewicz & Hoaglin): 0.6745 * |x - median| / MAD, per metric.
+    # A metric whose MAD is 0 (e.g. mostly identical values) contributes 0.
+    median = np.median(X, axis=0)
+    deviation = np.abs(X - median)
+    mad = np.median(deviation, axis=0)
+    scale = np.where(mad > 0, mad / 0.6745, np.inf)
+    return (deviation / scale).max(axis=1)
+
+
+def _isolation_scores(X: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Anomaly score per row in (0, 1], higher is more unusual; compare against
+    ISOLATION_SCORE_THRESHOLD. None when scikit-learn is unavailable.
+    The forest only ever looks at 256 rows per tree, so it is fitted on a sample;
+    scoring every row is the only full pass.
+    """
+    try:
+        from sklearn.ensemble import IsolationForest
+    except ImportError:
+        return None
+    rng = np.random.default_rng(0)
+    sample = X[rng.choice(len(X), ISOLATION_FIT_ROWS, replace=False)] if len(X) > ISOLATION_FIT_ROWS else X
+    forest = IsolationForest(n_estimators=ISOLATION_TREES, random_state=0, n_jobs=-1).fit(sample)
+    # score_samples is the negated anomaly score of the original paper
+    return -forest.score_samples(X.astype(np.float32))
+
+
+def _duplicate_of(ids: np.ndarray, name_codes: np.ndarray, X32: np.ndarray) -> np.ndarray:
+    """
+    For each row, the id of the earliest record with the same name and identical inputs
+    (-1 if none). Rows are hashed to 64 bits and sorted by (hash, id); candidates are
+    confirmed against the first row of their hash group, so collisions are not reported.
+    """
+    n = len(ids)
+    dup_of = np.full(n, -1, dtype=np.int64)
+    if n < 2:
+        return dup_of
+    bits = np.ascontiguousarray(X32, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    h = name_codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    for j in range(bits.shape[1]):
+        h ^= bits[:, j]
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(31)
+    order = np.lexsort((ids, h))
+    hs = h[order]
+    starts = np.r_[True, hs[1:] != hs[:-1]]
+    first = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+    same = (name_codes[order] == name_codes[first]) & (bits[order] == bits[first]).all(axis=1)
+    is_dup = ~starts & same
+    dup_of[order[is_dup]] = ids[first[is_dup]]
+    return dup_of
+
+
+def check_data_quality(
+    cols: Dict[str, np.ndarray],
+    isolation: bool = True,
+    z_threshold: float = ROBUST_Z_THRESHOLD,
+    isolation_threshold: float = ISOLATION_SCORE_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Runs every check in QUALITY_CHECKS over column arrays shaped like
+    StudentColumnStore.columns(). Returns {"rows", "flagged", "seconds",
+    "counts": {check: rows}, "columns": {...}}, where columns holds only the flagged
+    rows: id, name, the metrics, predicted_grade, issues (comma-separated check names),
+    robust_z, anomaly_score and duplicate_of (-1 for none).
+    """
+    started = time.perf_counter()
+    n = len(cols["id"])
+    X32 = np.column_stack([cols[m] for m in METRICS]).astype(np.float32) if n else np.empty((0, len(METRICS)), np.float32)
+    X = X32.astype(np.float64)
+    grade_codes = cols["grade_code"].astype(int)
+
+    flags = _rule_flags(X, grade_codes)
+    robust_z = _robust_z(X) if n else np.zeros(0)
+    flags["robust_outlier"] = robust_z > z_threshold
+    anomaly = _isolation_scores(X) if isolation and n >= 256 else None
+    if anomaly is None:
+        anomaly = np.zeros(n)
+        flags["isolation_outlier"] = np.zeros(n, dtype=bool)
+    else:
+        flags["isolation_outlier"] = anomaly > isolation_threshold
+    duplicate_of = _duplicate_of(cols["id"].astype(np.int64), cols["name_code"], X32)
+    flags["duplicate"] = duplicate_of >= 0
+
+    # Each row's checks as a bit code; the issue label is built once per distinct code
+    codes = np.zeros(n, dtype=np.int64)
+    for bit, check in enumerate(QUALITY_CHECKS):
+        codes |= flags[check].astype(np.int64) << bit
+    flagged = np.flatnonzero(codes)
+    distinct, inverse = np.unique(codes[flagged], return_inverse=True)
+    labels = np.array(
+        [", ".join(c for bit, c in enumerate(QUALITY_CHECKS) if code >> bit & 1) for code in distinct], dtype=object
+    )
+
+    out: Dict[str, np.ndarray] = {"id": cols["id"][flagged], "name": cols["name"][flagged]}
+    for m in METRICS:
+        out[m] = np.round(X[flagged, METRICS.index(m)], 4)
+    out["predicted_grade"] = np.asarray(GRADE_CODES, dtype=object)[grade_codes[flagged]]
+    out["issues"] = labels[inverse.ravel()] if len(flagged) else np.empty(0, dtype=object)
+    out["robust_z"] = np.round(robust_z[flagged], 2)
+    out["anomaly_score"] = np.round(anomaly[flagged], 4)
+    out["duplicate_of"] = duplicate_of[flagged]
+    return {
+        "rows": n,
+        "flagged": int(len(flagged)),
+        "seconds": round(time.perf_counter() - started, 3),
+        "counts": {check: int(flags[check].sum()) for check in QUALITY_CHECKS},
+        "columns": out,
+    }
+
+
+# Arrow IPC snapshots for offline analytics
+_MANIFEST = "manifest.json"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+    except ImportError as exc:
+        raise RuntimeError("Snapshots require 'pyarrow' installed.") from exc
+    return pa, ipc
+
+
+def _read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(directory, _MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(directory, _MANIFEST)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def snapshot_exists(directory: str = SNAPSHOT_DIR) -> bool:
+    return _read_manifest(directory) is not None
+
+
+def _rows_to_record_batch(rows: List[Dict[str, Any]], deleted: Optional[List[bool]] = None):
+    import backend  # risk columns; imported here because backend imports this module
+
+    pa, _ = _require_pyarrow()
+    X = np.array([[float(r[m] or 0.0) for m in METRICS] for r in rows], dtype=float).reshape(len(rows), len(METRICS))
+    codes = np.array([GRADE_CODES.index(r["predicted_grade"]) if r["predicted_grade"] else 0 for r in rows], dtype=int)
+    risk, levels = backend.compute_risk_batch(X, np.eye(len(GRADE_CODES))[codes])
+    columns = {
+        "id": pa.array([r["id"] for r in rows], type=pa.int64()),
+        "name": pa.array([r["name"] for r in rows], type=pa.string()),
+    }
+    for i, m in enumerate(METRICS):
+        columns[m] = pa.array(X[:, i], type=pa.float64())
+    columns["predicted_grade"] = pa.array([r["predicted_grade"] for r in rows], type=pa.string()).dictionary_encode()
+    columns["risk_score"] = pa.array(risk, type=pa.float64())
+    columns["risk_level"] = pa.array(levels.tolist(), type=pa.string()).dictionary_encode()
+    columns["deleted"] = pa.array(deleted if deleted is not None else [False] * len(rows), type=pa.bool_())
+    return pa.RecordBatch.from_pydict(columns)
+
+
+def _write_part(directory: str, name: str, batches: List[Any]) -> int:
+    pa, ipc = _require_pyarrow()
+    path = os.path.join(directory, name)
+    rows = 0
+    # Uncompressed IPC so the loader can memory-map the file and read it without copying
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        writer = None
+        for batch in batches:
+            if writer is None:
+                writer = ipc.new_file(sink, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        if writer is not None:
+            writer.close()
+    os.replace(path + ".tmp", path)
+    return rows
+
+
+def write_snapshot(
+    directory: str = SNAPSHOT_DIR, full: bool = False, part_rows: int = 250000, shard: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Writes the students table, with derived risk columns, as Arrow IPC files.
+    The first snapshot (or full=True) writes base partitions of part_rows rows each.
+    Later calls write one delta partition holding only the rows changed since the last
+    snapshot (from the student_changes feed); deleted rows are written as tombstones.
+    The manifest records the source database; a directory holding another database's
+    snapshot is rewritten in full rather than mixing the two.
+    Returns the updated manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = _read_manifest(directory)
+    source = os.path.abspath(database.shard_path(shard))
+
+    if manifest is not None and not full and manifest.get("source") == source:
+        feed = database.changes_since(manifest["seq"], limit=1_000_000_000, shard=shard)
+        if not feed["reset"]:
+            latest: Dict[int, Dict[str, Any]] = {}
+            for change in feed["changes"]:
+                latest[change["student_id"]] = change
+            if latest:
+                rows = [{**c, "id": sid} for sid, c in latest.items()]
+                deleted = [c["op"] == "DELETE" for c in latest.values()]
+                for start in range(0, len(rows), part_rows):
+                    name = f"delta-{feed['last_seq']:012d}-{start // part_rows:05d}.arrow"
+                    batch = _rows_to_record_batch(rows[start:start + part_rows], deleted[start:start + part_rows])
+                    manifest["parts"].append({"file": name, "kind": "delta", "rows": _write_part(directory, name, [batch])})
+            manifest["seq"] = feed["last_seq"]
+            _write_manifest(directory, manifest)
+            return manifest
+
+    # Full snapshot: take the seq first so concurrent writes land in the next delta
+    seq = database.get_change_seq(shard)
+    parts: List[Dict[str, Any]] = []
+    batches: List[Any] = []
+    buffered = 0
+    for rows in database.iter_student_chunks(50000, shard=shard):
+        batches.append(_rows_to_record_batch(rows))
+        buffered += len(rows)
+        if buffered >= part_rows:
+            name = f"base-{seq:012d}-{len(parts):05d}.arrow"
+            parts.append({"file": name, "kind": "base", "rows": _write_part(directory, name, batches)})
+            batches, buffered = [], 0
+    if batches or not parts:
+        name = f"base-{seq:012d}-{len(parts):05d}.arrow"
+        if not batches:
+            batches = [_rows_to_record_batch([])]
+        parts.append({"file": name, "kind": "base", "rows": _write_part(directory, name, batches)})
+
+    old_files = [p["file"] for p in manifest["parts"]] if manifest else []
+    manifest = {"source": source, "seq": seq, "parts": parts}
+    _write_manifest(directory, manifest)
+    for name in old_files:
+        if name not in {p["file"] for p in parts} and os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+    return manifest
+
+
+def load_snapshot(directory: str = SNAPSHOT_DIR):
+    """
+    Memory-maps every partition of a snapshot and returns one pyarrow Table of the
+    current rows. Base-only snapshots are read without copying; delta partitions are
+    applied by keeping each id's latest version and dropping tombstones.
+    """
+    pa, ipc = _require_pyarrow()
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot found in {directory!r}.")
+    tables = []
+    for part in manifest["parts"]:
+        source = pa.memory_map(os.path.join(directory, part["file"]), "r")
+        tables.append(ipc.open_file(source).read_all())
+    table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+    if not any(p["kind"] == "delta" for p in manifest["parts"]):
+        return table.drop_columns(["deleted"])
+
+    # Later partitions win: find each id's last occurrence, then drop tombstones
+    ids = table.column("id").to_numpy()
+    reversed_ids = ids[::-1]
+    _, first_in_reversed = np.unique(reversed_ids, return_index=True)
+    latest = np.sort(len(ids) - 1 - first_in_reversed)
+    deleted = table.column("deleted").to_numpy(zero_copy_only=False)
+    keep = latest[~deleted[latest]]
+    keep = keep[np.argsort(ids[keep], kind="stable")]
+    return table.take(pa.array(keep)).drop_columns(["deleted"])
+
+
+def snapshot_columns(directory: str = SNAPSHOT_DIR) -> Dict[str, np.ndarray]:
+    """
+    Snapshot rows in the same column layout as backend.get_report_columns().
+    """
+    table = load_snapshot(directory)
+    cols: Dict[str, np.ndarray] = {}
+    for name in ["id", "name", *METRICS, "predicted_grade", "risk_score", "risk_level"]:
+        cols[name] = table.column(name).to_numpy()
+    return cols
@@ -1,11 +1,8 @@
-import io
-from typing import Dict, Any, List
 import streamlit as st
-import pandas as pd
-import altair as alt
 from streamlit.components.v1 import html as stc_html
 
 import backend
+import reports
 
 # Page config
 st.set_page_config(page_title="Advanced Student Performance Tracker", page_icon="🎓", layout="wide")
@@ -147,6 +144,9 @@ stc_html(
 
 st.markdown('<div class="app-bg">', unsafe_allow_html=True)
 
+# Background archival and ANALYZE/VACUUM; idempotent across reruns
+backend.start_maintenance()
+
 # Session state
 if "auth" not in st.session_state:
     st.session_state.auth = {"logged_in": False, "username": "", "role": ""}
@@ -154,6 +154,9 @@ if "auth" not in st.session_state:
 
 def logout():
     st.session_state.auth = {"logged_in": False, "username": "", "role": ""}
+    st.session_state.pop("last_result", None)
+    st.session_state.pop("quality_report", None)
+    st.session_state.pop("pdf_future", None)
 
 
 with st.sidebar:
@@ -200,7 +203,18 @@ def welcome_card():
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+@st.fragment(run_every=0.5)
+def _pdf_progress(future) -> None:
+    if future.done():
+        st.rerun()
+    st.caption("Rendering PDF…")
+
+
 def student_dashboard():
+    # pandas/altair are only needed once signed in; keep them off the login screen's cold start
+    import pandas as pd
+    import altair as alt
+
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("Student Dashboard", anchor=False)
     st.caption("Enter your performance data to get a predicted grade and recommendations.")
@@ -225,6 +239,34 @@ def student_dashboard():
             "extracurriculars": extracurriculars,
         }
         grade, prob_map = backend.predict_grade(data)
+
+        # Save record (use username as the student's 'name')
+        name = st.session_state.auth["username"]
+        record_id = backend.add_student(
+            name=name,
+            attendance=attendance,
+            marks=marks,
+            assignments=assignments,
+            study_hours=study_hours,
+            extracurriculars=extracurriculars,
+            predicted_grade=grade,
+        )
+        # Kept across reruns so the interactive widgets below don't clear the result
+        st.session_state.last_result = {
+            "data": data,
+            "grade": grade,
+            "prob_map": prob_map,
+            "name": name,
+            "record_id": record_id,
+        }
+
+    result = st.session_state.get("last_result")
+    if result:
+        data = result["data"]
+        grade = result["grade"]
+        prob_map = result["prob_map"]
+        name = result["name"]
+        record_id = result["record_id"]
         st.success(f"Predicted Grade: {grade}")
 
         # Probabilities bar chart using Altair
@@ -249,7 +291,48 @@ def student_dashboard():
             .configure_view(strokeWidth=0)
             .configure(background="transparent")
         )
-        st.altair_chart(prob_chart, use_container_width=True, theme=None)
+
+        # Which inputs pushed the model toward (or away from) the predicted grade
+        try:
+            explanation = backend.explain_prediction(data, grade)
+        except TypeError:
+            explanation = None  # model is not a tree ensemble
+
+        if explanation is None:
+            st.altair_chart(prob_chart, use_container_width=True, theme=None)
+        else:
+            p1, p2 = st.columns(2)
+            with p1:
+                st.altair_chart(prob_chart, use_container_width=True, theme=None)
+            with p2:
+                feature_names = {
+                    "attendance": "Attendance",
+                    "marks": "Marks",
+                    "assignments": "Assignments",
+                    "study_hours": "Study hours",
+                    "extracurriculars": "Extracurriculars",
+                }
+                attr_df = pd.DataFrame(
+                    [
+                        {"Feature": feature_names[f], "Contribution": round(v, 4)}
+                        for f, v in explanation["attributions"].items()
+                    ]
+                )
+                attr_chart = (
+                    alt.Chart(attr_df)
+                    .mark_bar(cornerRadius=4)
+                    .encode(
+                        y=alt.Y("Feature:N", sort="-x", title=None),
+                        x=alt.X("Contribution:Q", title=f"Effect on P(grade {grade})", axis=alt.Axis(format="+%")),
+                        color=alt.condition(alt.datum.Contribution >= 0, alt.value("#16a34a"), alt.value("#dc2626")),
+                        tooltip=[alt.Tooltip("Feature:N"), alt.Tooltip("Contribution:Q", format="+.1%")],
+                    )
+                    .properties(height=160, width="container")
+                    .configure_view(strokeWidth=0)
+                    .configure(background="transparent")
+                )
+                st.altair_chart(attr_chart, use_container_width=True, theme=None)
+                st.caption(f"Relative to the model's baseline of {explanation['baseline']:.0%} for grade {grade}.")
 
         risk_score, risk_level, risk_actions = backend.compute_risk(data, prob_map)
         st.markdown("##### Risk assessment")
@@ -263,33 +346,35 @@ def student_dashboard():
         for tip in risk_actions:
             st.write(f"- {tip}")
 
+        # Where this submission stands among all stored records
+        st.markdown("##### Where you stand")
+        percentiles = backend.get_cohort_percentiles(data, grade)
+        rank_labels = [
+            ("Attendance", "attendance"),
+            ("Marks", "marks"),
+            ("Assignments", "assignments"),
+            ("Study hours", "study_hours"),
+            ("Extracurriculars", "extracurriculars"),
+        ]
+        rank_cols = st.columns(len(rank_labels) + 1)
+        for col, (label, key) in zip(rank_cols, rank_labels):
+            with col:
+                st.metric(label, f"{percentiles[key]:.0f}th pct")
+        with rank_cols[-1]:
+            st.metric("Risk", f"{percentiles['risk']:.0f}th pct", help="Lower is better: share of records with lower risk.")
+        st.caption("Percentile among all submitted records (higher means ahead of more of the cohort).")
+
         # Recommendations
         recs = backend.get_recommendations(data)
         st.markdown("##### Recommendations")
         for r in recs:
             st.write(f"- {r}")
 
-        # Save record (use username as the student's 'name')
-        name = st.session_state.auth["username"]
-        record_id = backend.add_student(
-            name=name,
-            attendance=attendance,
-            marks=marks,
-            assignments=assignments,
-            study_hours=study_hours,
-            extracurriculars=extracurriculars,
-            predicted_grade=grade,
-        )
-
         # Download CSV
         csv_df = pd.DataFrame([{
             "id": record_id,
             "name": name,
-            "attendance": attendance,
-            "marks": marks,
-            "assignments": assignments,
-            "study_hours": study_hours,
-            "extracurriculars": extracurriculars,
+            **data,
             "predicted_grade": grade,
         }])
         csv_bytes = csv_df.to_csv(index=False).encode("utf-8")
@@ -301,25 +386,109 @@ def student_dashboard():
             use_container_width=True,
         )
 
-        # Download PDF
-        pdf_bytes = generate_pdf(
-            name=name,
-            record_id=record_id,
-            data=data,
-            grade=grade,
-            recommendations=recs,
-        )
-        st.download_button(
-            label="Download report (PDF)",
-            data=pdf_bytes,
-            file_name=f"{name}_report_{record_id}.pdf",
-            mime="application/pdf",
-            use_container_width=True,
+        # Download PDF: rendered on a worker only when asked for, then cached per record.
+        # The script never waits on the render; a polling fragment reruns the page when it is done.
+        pdf_bytes = reports.cached_pdf(record_id, name, data, grade, recs)
+        pending = st.session_state.get("pdf_future")
+        if pending is not None and (pending[0] != record_id or pdf_bytes is not None):
+            st.session_state.pop("pdf_future", None)
+            pending = None
+        if pdf_bytes is None and pending is None:
+            if st.button("Prepare report (PDF)", use_container_width=True, key="prepare_pdf"):
+                pending = (record_id, reports.request_pdf(record_id, name, data, grade, recs))
+                st.session_state.pdf_future = pending
+        if pdf_bytes is None and pending is not None:
+            if pending[1].done():
+                st.session_state.pop("pdf_future", None)
+                try:
+                    pdf_bytes = pending[1].result()
+                except Exception as exc:
+                    st.error(f"Could not render the PDF: {exc}")
+            else:
+                _pdf_progress(pending[1])
+        if pdf_bytes is not None:
+            st.download_button(
+                label="Download report (PDF)",
+                data=pdf_bytes,
+                file_name=f"{name}_report_{record_id}.pdf",
+                mime="application/pdf",
+                use_container_width=True,
+            )
+
+        # What-if explorer: one batched prediction over a grid around the inputs
+        st.markdown("##### What if?")
+        st.caption("See how your predicted grade and risk change as two of your inputs change.")
+        feature_labels = {
+            "attendance": "Attendance (%)",
+            "marks": "Marks (%)",
+            "assignments": "Assignments (%)",
+            "study_hours": "Study Hours per week",
+            "extracurriculars": "Extracurriculars (0–10)",
+        }
+        w1, w2 = st.columns(2)
+        with w1:
+            x_feature = st.selectbox(
+                "Horizontal axis", list(feature_labels), index=3, format_func=feature_labels.get, key="what_if_x"
+            )
+        with w2:
+            y_options = [f for f in feature_labels if f != x_feature]
+            y_feature = st.selectbox("Vertical axis", y_options, format_func=feature_labels.get, key="what_if_y")
+        grid = backend.what_if_grid(data, x_feature, y_feature)
+        grid_df = pd.DataFrame(
+            {
+                "x": grid["x"],
+                "y": grid["y"],
+                "Grade": grid["grade"],
+                "Risk": grid["risk"],
+                "Risk level": grid["risk_level"],
+            }
         )
+        x_enc = alt.X("x:O", title=feature_labels[x_feature], axis=alt.Axis(format=".0f", labelOverlap=True))
+        y_enc = alt.Y("y:O", title=feature_labels[y_feature], sort="descending", axis=alt.Axis(format=".0f", labelOverlap=True))
+        tooltip = [
+            alt.Tooltip("x:Q", title=feature_labels[x_feature], format=".1f"),
+            alt.Tooltip("y:Q", title=feature_labels[y_feature], format=".1f"),
+            alt.Tooltip("Grade:N"),
+            alt.Tooltip("Risk:Q", format=".0%"),
+        ]
+        g1, g2 = st.columns(2)
+        with g1:
+            grade_map = (
+                alt.Chart(grid_df)
+                .mark_rect()
+                .encode(
+                    x=x_enc,
+                    y=y_enc,
+                    color=alt.Color("Grade:N", sort=grade_order, title="Grade"),
+                    tooltip=tooltip,
+                )
+                .properties(height=260, width="container", title="Predicted grade")
+                .configure_view(strokeWidth=0)
+                .configure(background="transparent")
+            )
+            st.altair_chart(grade_map, use_container_width=True, theme=None)
+        with g2:
+            risk_map = (
+                alt.Chart(grid_df)
+                .mark_rect()
+                .encode(
+                    x=x_enc,
+                    y=y_enc,
+                    color=alt.Color("Risk:Q", title="Risk", scale=alt.Scale(domain=[0, 1], scheme="redyellowgreen", reverse=True)),
+                    tooltip=tooltip,
+                )
+                .properties(height=260, width="container", title="Risk")
+                .configure_view(strokeWidth=0)
+                .configure(background="transparent")
+            )
+            st.altair_chart(risk_map, use_container_width=True, theme=None)
 
     # History
     with st.expander("View my recent submissions"):
-        rows = backend.get_students_by_name(st.session_state.auth["username"])
+        include_archived = bool(backend.list_archives()) and st.checkbox(
+            "Include archived terms", value=False, key="history_archived"
+        )
+        rows = backend.get_students_by_name(st.session_state.auth["username"], include_archived=include_archived)
         if rows:
             st.dataframe(pd.DataFrame(rows))
         else:
@@ -329,18 +498,39 @@ def student_dashboard():
 
 
 def teacher_dashboard():
+    import pandas as pd
+    import altair as alt
+
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("Teacher Dashboard", anchor=False)
     st.caption("Manage student records and see class-level insights.")
 
-    tab_view, tab_add, tab_update, tab_remove, tab_reports = st.tabs(
-        ["View Records", "Add Record", "Update Record", "Remove Record", "Reports"]
+    tab_view, tab_add, tab_update, tab_remove, tab_reports, tab_quality = st.tabs(
+        ["View Records", "Add Record", "Update Record", "Remove Record", "Reports", "Data Quality"]
     )
 
     with tab_view:
-        rows = backend.get_all_students()
+        include_archived = bool(backend.list_archives()) and st.checkbox(
+            "Include archived terms", value=False, key="view_archived"
+        )
+        rows = backend.get_all_students(include_archived=include_archived)
         if rows:
             st.dataframe(pd.DataFrame(rows))
+            st.caption("After a model change, re-score every stored record with the current model.")
+            if st.button("Re-grade all records", use_container_width=True, key="regrade_btn"):
+                bar = st.progress(0.0, text="Re-grading…")
+
+                def _on_progress(done: int, total: int, last_id: int) -> None:
+                    bar.progress(done / total if total else 1.0, text=f"Re-graded {done}/{total} records")
+
+                summary = backend.regrade_all(progress=_on_progress)
+                st.success(f"Re-graded {summary['processed']} records; {summary['changed']} grades changed.")
+                if summary["transitions"]:
+                    st.dataframe(
+                        pd.DataFrame(
+                            [{"Change": k, "Records": v} for k, v in summary["transitions"].items()]
+                        )
+                    )
         else:
             st.info("No records yet.")
 
@@ -439,11 +629,15 @@ def teacher_dashboard():
                     st.error("Remove failed.")
 
     with tab_reports:
-        rows = backend.get_all_students()
-        if not rows:
+        snapshot_dir = None
+        if backend.analytics.snapshot_exists():
+            source = st.radio("Data source", ["Live database", "Latest snapshot"], horizontal=True, key="report_source")
+            if source == "Latest snapshot":
+                snapshot_dir = backend.analytics.SNAPSHOT_DIR
+        df = pd.DataFrame(backend.get_report_columns(snapshot_dir=snapshot_dir))
+        if df.empty:
             st.info("No data for reports yet.")
         else:
-            df = pd.DataFrame(rows)
             st.markdown("##### Grade Distribution")
             grade_counts = df["predicted_grade"].value_counts()
             grade_order = ["A", "B", "C", "D"]
@@ -466,20 +660,6 @@ def teacher_dashboard():
             st.altair_chart(grade_chart, use_container_width=True, theme=None)
 
             st.markdown("##### Risk Overview")
-            def _row_risk(row):
-                data = {
-                    "attendance": float(row["attendance"]),
-                    "marks": float(row["marks"]),
-                    "assignments": float(row["assignments"]),
-                    "study_hours": float(row["study_hours"]),
-                    "extracurriculars": float(row["extracurriculars"]),
-                }
-                pseudo_probs = {"A": 0, "B": 0, "C": 0, "D": 0}
-                pseudo_probs[str(row["predicted_grade"])] = 1.0
-                score, level, _ = backend.compute_risk(data, pseudo_probs)
-                return score, level
-
-            df["risk_score"], df["risk_level"] = zip(*df.apply(_row_risk, axis=1))
             risk_counts = df["risk_level"].value_counts().reindex(["High", "Medium", "Low"]).fillna(0).astype(int).reset_index()
             risk_counts.columns = ["Risk", "Count"]
 
@@ -553,6 +733,19 @@ def teacher_dashboard():
                     "- Low risk: maintain habits; set monthly goals and peer study groups to keep momentum."
                 )
 
+            shards = backend.list_shards()
+            if shards:
+                st.markdown("##### All Schools (sharded)")
+                summary = backend.get_class_summary_all_shards(shards)
+                per_shard = pd.DataFrame(
+                    [
+                        {"Shard": shard, "Students": part["count"], **{g: part["grade_counts"].get(g, 0) for g in grade_order}}
+                        for shard, part in summary["per_shard"].items()
+                    ]
+                )
+                st.dataframe(per_shard)
+                st.caption(f"{summary['count']} records across {len(shards)} shards.")
+
             # Existing average metrics table
             st.markdown("##### Average Metrics")
             avg_df = df[
@@ -568,71 +761,38 @@ def teacher_dashboard():
             else:
                 st.info("No students currently flagged as High risk.")
 
-    st.markdown("</div>", unsafe_allow_html=True)
-
-
-def generate_pdf(name: str, record_id: int, data: Dict[str, Any], grade: str, recommendations: List[str]) -> bytes:
-    # Generates a simple PDF using reportlab
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import mm
-    except Exception:
-        # Fallback simple text PDF via reportlab not available -> return a text-like PDF header to avoid crash
-        return b"%PDF-1.4\n% PDF generation requires 'reportlab' installed."
-
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    width, height = A4
-
-    y = height - 25 * mm
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(25 * mm, y, "Student Performance Report")
-    y -= 12 * mm
-
-    c.setFont("Helvetica", 11)
-    c.drawString(25 * mm, y, f"Student: {name}")
-    y -= 7 * mm
-    c.drawString(25 * mm, y, f"Record ID: {record_id}")
-    y -= 10 * mm
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(25 * mm, y, "Inputs")
-    y -= 7 * mm
-    c.setFont("Helvetica", 11)
-    for label, key in [
-        ("Attendance (%)", "attendance"),
-        ("Marks (%)", "marks"),
-        ("Assignments (%)", "assignments"),
-        ("Study Hours (per week)", "study_hours"),
-        ("Extracurriculars (0–10)", "extracurriculars"),
-    ]:
-        c.drawString(25 * mm, y, f"{label}: {data[key]}")
-        y -= 6 * mm
-
-    y -= 4 * mm
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(25 * mm, y, f"Predicted Grade: {grade}")
-    y -= 10 * mm
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(25 * mm, y, "Recommendations")
-    y -= 7 * mm
-    c.setFont("Helvetica", 11)
-    if recommendations:
-        for r in recommendations:
-            c.drawString(28 * mm, y, f"- {r}")
-            y -= 6 * mm
-            if y < 20 * mm:
-                c.showPage()
-                y = height - 25 * mm
-    else:
-        c.drawString(28 * mm, y, "- Keep it up!")
+    with tab_quality:
+        st.caption("Flags impossible inputs, statistical outliers and duplicate submissions across all records.")
+        isolation = st.checkbox("Include isolation-forest outliers", value=True, key="quality_isolation")
+        if st.button("Run checks", use_container_width=True, key="quality_btn"):
+            st.session_state.quality_report = backend.get_data_quality(isolation=isolation)
+        report = st.session_state.get("quality_report")
+        if report is not None:
+            st.markdown(f"**{report['flagged']}** of {report['rows']} records flagged ({report['seconds']}s).")
+            counts = pd.DataFrame(
+                [
+                    {"Check": check, "Description": backend.analytics.QUALITY_CHECKS[check], "Records": n}
+                    for check, n in report["counts"].items()
+                ]
+            )
+            st.dataframe(counts, hide_index=True)
+            flagged = pd.DataFrame(report["columns"])
+            if len(flagged):
+                issue = st.selectbox("Show", ["All flagged"] + [c for c, n in report["counts"].items() if n], key="quality_filter")
+                if issue != "All flagged":
+                    flagged = flagged[flagged["issues"].str.split(", ").apply(lambda checks: issue in checks)]
+                st.dataframe(flagged.reset_index(drop=True))
+                st.download_button(
+                    "Download flagged rows (CSV)",
+                    data=flagged.to_csv(index=False).encode("utf-8"),
+                    file_name="data_quality.csv",
+                    mime="text/csv",
+                    use_container_width=True,
+                )
+            else:
+                st.success("No data-quality issues found.")
 
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    return buf.read()
+    st.markdown("</div>", unsafe_allow_html=True)
 
 
 # Router
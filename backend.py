@@ -1,17 +1,51 @@
 from __future__ import annotations
 
+import argparse
+import collections
+import functools
 import os
-from typing import Dict, Any, Tuple, List, Optional
+import tempfile
+import time
+import subprocess
+import sys
+from typing import TYPE_CHECKING, Deque, Dict, Any, Tuple, List, Optional
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-import joblib
 import bcrypt
 
+import analytics
 import database
 
+# sklearn and joblib are imported inside the ML functions: the login path never needs them
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestClassifier
+
 MODEL_PATH = os.environ.get("STUDENT_TRACKER_MODEL_PATH", "model.pkl")
 _MODEL: RandomForestClassifier | None = None
 _CLASSES: List[str] | None = None
+_EXPLAINER: Tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+
+FEATURES = ["attendance", "marks", "assignments", "study_hours", "extracurriculars"]
+GRADES = ["A", "B", "C", "D"]
+# Input bounds as enforced by the dashboard forms
+FEATURE_RANGES: Dict[str, Tuple[float, float]] = {
+    "attendance": (0.0, 100.0),
+    "marks": (0.0, 100.0),
+    "assignments": (0.0, 100.0),
+    "study_hours": (0.0, 80.0),
+    "extracurriculars": (0.0, 10.0),
+}
+
+# What `python -m backend optimize` chooses with its defaults (smallest random forest within
+# 1 point of the best held-out accuracy): about half the size and latency of the most
+# accurate candidate. Fresh installs train this directly in _ensure_model. Only random
+# forests are searched, since warm-start retraining and explain_batch need one.
+DEFAULT_MODEL_PARAMS: Dict[str, Any] = {
+    "n_estimators": 50,
+    "max_depth": 14,
+    "min_samples_leaf": 1,
+    "random_state": 0,
+    "class_weight": "balanced_subsample",
+}
 
 
 def _generate_synthetic_dataset(n: int = 2000, seed: int = 42):
@@ -46,43 +80,336 @@ def _generate_synthetic_dataset(n: int = 2000, seed: int = 42):
     return X, y
 
 
+def _set_model(model: Any) -> None:
+    # Swaps the served model and drops everything cached from the previous one
+    global _MODEL, _CLASSES
+    global _EXPLAINER
+    _MODEL = model
+    _CLASSES = list(model.classes_)
+    _EXPLAINER = None
+    _what_if_cached.cache_clear()
+    _explain_cached.cache_clear()
+
+
 def _ensure_model():
     global _MODEL, _CLASSES
     if _MODEL is not None:
         return
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
     if os.path.exists(MODEL_PATH):
-        _MODEL = joblib.load(MODEL_PATH)
-        _CLASSES = list(_MODEL.classes_)  # type: ignore
+        _set_model(joblib.load(MODEL_PATH))
         return
     # Train new model
     X, y = _generate_synthetic_dataset()
-    model = RandomForestClassifier(n_estimators=200, random_state=0, class_weight="balanced_subsample")
+    model = RandomForestClassifier(**DEFAULT_MODEL_PARAMS)
     model.fit(X, y)
     joblib.dump(model, MODEL_PATH)
-    _MODEL = model
-    _CLASSES = list(model.classes_)
+    _set_model(model)
+
+
+def _rows_to_matrix(rows: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([[float(r[f]) for f in FEATURES] for r in rows], dtype=float)
+
+
+def _publish_model(model: Any, path: str) -> None:
+    # Dump next to the target and rename over it so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".model-", suffix=".pkl", dir=directory)
+    os.close(fd)
+    import joblib
+
+    try:
+        joblib.dump(model, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _grow_forest(
+    model: RandomForestClassifier | None,
+    X: np.ndarray,
+    y: np.ndarray,
+    n_trees: int,
+    class_weight: Dict[str, float],
+) -> RandomForestClassifier:
+    # Adds n_trees trees fitted on (X, y) only; earlier trees are kept as-is (warm start)
+    from sklearn.ensemble import RandomForestClassifier
+
+    # Same tree shape as the shipped compact model; class weights come from the whole table
+    tree_params = {k: v for k, v in DEFAULT_MODEL_PARAMS.items() if k not in ("n_estimators", "class_weight")}
+    if model is None:
+        model = RandomForestClassifier(
+            n_estimators=n_trees,
+            class_weight=class_weight,
+            warm_start=True,
+            n_jobs=-1,
+            **tree_params,
+        )
+    else:
+        model.set_params(n_estimators=model.n_estimators + n_trees, class_weight=class_weight, **tree_params)
+    model.fit(X, y)
+    return model
+
+
+def _trees_for_chunk(index: int, n_chunks: int, budget: int) -> int:
+    # Spreads budget trees evenly over n_chunks; with more chunks than trees, chunks are
+    # subsampled (evenly spaced ones get one tree each, the rest none)
+    return (index + 1) * budget // n_chunks - index * budget // n_chunks
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+    return round(peak_bytes / (1024 * 1024), 2)
+
+
+def retrain_model(
+    chunk_size: int = 5000,
+    n_trees: int = DEFAULT_MODEL_PARAMS["n_estimators"],
+    holdout_every: int = 10,
+    warm_start: bool = False,
+    model_path: Optional[str] = None,
+    max_trees: int = 2 * DEFAULT_MODEL_PARAMS["n_estimators"],
+    exemplars_per_grade: int = 25,
+) -> Dict[str, Any]:
+    """
+    Retrains the grade model on the stored students records.
+    Records are streamed in chunks and n_trees trees (DEFAULT_MODEL_PARAMS depth limits)
+    are spread over them with warm start, so memory is bounded by one chunk and the
+    forest size does not depend on the table size. Chunks lacking a grade are topped up
+    with a few exemplar rows of that grade, so every fit sees all classes.
+    With warm_start=True the existing model at model_path keeps its trees and grows;
+    only the newest max_trees trees are kept.
+    Labels are the stored predicted_grade values, i.e. earlier model outputs, so the
+    holdout metric is agreement with those stored grades, not accuracy against true outcomes.
+    Every holdout_every-th record (by id) is held out and scored in a second pass.
+    Returns training metrics; the new model is published atomically to model_path.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    path = model_path or MODEL_PATH
+
+    # "balanced" weights from the whole table, since each fit only sees one chunk
+    counts = database.get_grade_counts()
+    total = sum(counts.get(g, 0) for g in GRADES)
+    if any(counts.get(g, 0) == 0 for g in GRADES):
+        raise ValueError("Not enough labelled records to train: every grade A-D must be present.")
+    class_weight = {g: total / (len(GRADES) * counts[g]) for g in GRADES}
+
+    exemplars: Dict[str, List[Dict[str, Any]]] = {}
+    for g in GRADES:
+        rows = database.get_students_by_grade(g, limit=exemplars_per_grade * 2)
+        exemplars[g] = [r for r in rows if r["id"] % holdout_every != 0][:exemplars_per_grade] or rows[:1]
+
+    started = time.perf_counter()
+
+    model: RandomForestClassifier | None = None
+    if warm_start and os.path.exists(path):
+        existing = joblib.load(path)
+        if isinstance(existing, RandomForestClassifier) and sorted(existing.classes_) == GRADES:
+            model = existing
+            model.set_params(warm_start=True, n_jobs=-1)
+
+    n_chunks = max(1, -(-total // chunk_size))
+    n_train = 0
+    chunks_fit = 0
+    for index, rows in enumerate(database.iter_student_chunks(chunk_size)):
+        # Rows added since the count was taken get no trees, so the budget holds
+        trees = _trees_for_chunk(index, n_chunks, n_trees) if index < n_chunks else 0
+        if trees == 0:
+            continue
+        train = [r for r in rows if r["id"] % holdout_every != 0]
+        present = {r["predicted_grade"] for r in train}
+        for g in GRADES:
+            if g not in present:
+                train.extend(exemplars[g])
+        X = _rows_to_matrix(train)
+        y = np.array([r["predicted_grade"] for r in train], dtype=object)
+        model = _grow_forest(model, X, y, trees, class_weight)
+        n_train += len(train)
+        chunks_fit += 1
+
+    if model is None or chunks_fit == 0:
+        raise ValueError("Not enough labelled records to train: every grade A-D must be present.")
+    training_seconds = time.perf_counter() - started
+
+    # Held-out agreement with stored grades, streamed so the holdout never has to fit in memory either
+    n_holdout = 0
+    n_correct = 0
+    for rows in database.iter_student_chunks(chunk_size):
+        held = [r for r in rows if r["id"] % holdout_every == 0]
+        if not held:
+            continue
+        preds = model.predict(_rows_to_matrix(held))
+        n_correct += int(sum(p == r["predicted_grade"] for p, r in zip(preds, held)))
+        n_holdout += len(held)
+
+    if len(model.estimators_) > max_trees:
+        # Warm-start runs keep the newest trees so repeated retrains stay bounded
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(n_estimators=max_trees)
+
+    # Single-row predictions are slower with a thread pool, so serve with n_jobs unset
+    model.set_params(warm_start=False, n_jobs=None)
+    _publish_model(model, path)
+    if path == MODEL_PATH:
+        _set_model(model)
+
+    return {
+        "model_path": path,
+        "n_train": n_train,
+        "n_holdout": n_holdout,
+        "n_estimators": int(model.n_estimators),
+        "chunks_fit": chunks_fit,
+        "training_seconds": round(training_seconds, 3),
+        # Process high-water mark, so it includes memory used before retraining started
+        "peak_memory_mb": _peak_rss_mb(),
+        # Agreement with the stored (previously predicted) grades of held-out records
+        "holdout_agreement": round(n_correct / n_holdout, 4) if n_holdout else None,
+    }
+
+
+def _candidate_models() -> List[Tuple[str, Any]]:
+    # Random forests only: warm-start retraining and the path-based explainer both need one
+    from sklearn.ensemble import RandomForestClassifier
+
+    candidates: List[Tuple[str, Any]] = []
+    for n_estimators in (25, 50, 100, 200):
+        for max_depth in (8, 10, 14, None):
+            for min_samples_leaf in (1, 5):
+                params = {
+                    "n_estimators": n_estimators,
+                    "max_depth": max_depth,
+                    "min_samples_leaf": min_samples_leaf,
+                    "random_state": 0,
+                    "class_weight": "balanced_subsample",
+                }
+                label = f"rf(n={n_estimators}, depth={max_depth}, leaf={min_samples_leaf})"
+                candidates.append((label, RandomForestClassifier(**params)))
+    return candidates
+
+
+def _measure_model(model: Any, X_test: np.ndarray, y_test: np.ndarray, latency_rows: int = 100) -> Dict[str, float]:
+    import joblib
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".pkl")
+    os.close(fd)
+    try:
+        joblib.dump(model, tmp_path)
+        size_bytes = os.path.getsize(tmp_path)
+        load_times = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            joblib.load(tmp_path)
+            load_times.append(time.perf_counter() - t0)
+    finally:
+        os.remove(tmp_path)
+
+    # Same call shape as predict_grade: one row per predict_proba
+    latencies = []
+    for row in X_test[:latency_rows]:
+        t0 = time.perf_counter()
+        model.predict_proba(row.reshape(1, -1))
+        latencies.append(time.perf_counter() - t0)
+
+    return {
+        "accuracy": float(np.mean(model.predict(X_test) == y_test)),
+        "size_kb": size_bytes / 1024,
+        "load_ms": float(np.median(load_times)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+    }
+
+
+def _pareto_front(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Higher accuracy is better; smaller size, load time and latency are better
+    def dominates(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        no_worse = (
+            a["accuracy"] >= b["accuracy"]
+            and a["size_kb"] <= b["size_kb"]
+            and a["load_ms"] <= b["load_ms"]
+            and a["p99_ms"] <= b["p99_ms"]
+        )
+        better = (
+            a["accuracy"] > b["accuracy"]
+            or a["size_kb"] < b["size_kb"]
+            or a["load_ms"] < b["load_ms"]
+            or a["p99_ms"] < b["p99_ms"]
+        )
+        return no_worse and better
+
+    return [r for r in results if not any(dominates(o, r) for o in results if o is not r)]
+
+
+def optimize_model(
+    n_train: int = 2000,
+    n_test: int = 2000,
+    accuracy_tolerance: float = 0.01,
+    save: bool = False,
+    model_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Searches compact model configurations and measures accuracy, artifact size,
+    load time and p99 single-row latency for each.
+    The chosen model is the smallest artifact whose accuracy is within accuracy_tolerance
+    of the best. Size and accuracy are deterministic, unlike the timings, so the same
+    search always picks the same model; with save=True it is published to model_path.
+    """
+    X_train, y_train = _generate_synthetic_dataset(n_train)
+    X_test, y_test = _generate_synthetic_dataset(n_test, seed=7)
+
+    results: List[Dict[str, Any]] = []
+    models: Dict[str, Any] = {}
+    for label, model in _candidate_models():
+        model.fit(X_train, y_train)
+        metrics = _measure_model(model, X_test, y_test)
+        metrics["model"] = label
+        results.append(metrics)
+        models[label] = model
+
+    front = _pareto_front(results)
+    best_accuracy = max(r["accuracy"] for r in results)
+    eligible = [r for r in results if r["accuracy"] >= best_accuracy - accuracy_tolerance]
+    chosen = min(eligible, key=lambda r: (r["size_kb"], r["p99_ms"]))
+
+    path = model_path or MODEL_PATH
+    if save:
+        _publish_model(models[chosen["model"]], path)
+        if path == MODEL_PATH:
+            _set_model(models[chosen["model"]])
+    return {"results": results, "pareto": front, "chosen": chosen, "saved_to": path if save else None}
 
 
 # Auth
-def register_user(username: str, password: str, role: str) -> Tuple[bool, str]:
+def register_user(username: str, password: str, role: str, shard: Optional[str] = None) -> Tuple[bool, str]:
     if not username or not password or role not in ("Student", "Teacher"):
         return False, "Invalid inputs."
-    existing = database.get_user(username)
+    existing = database.get_user(username, shard)
     if existing:
         return False, "Username already exists."
     salt = bcrypt.gensalt()
     pw_hash = bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
-    ok = database.add_user(username, pw_hash, role)
+    ok = database.add_user(username, pw_hash, role, shard)
     if not ok:
         return False, "Could not create user (username may be taken)."
     return True, "Registration successful."
 
 
-def login_user(username: str, password: str) -> Tuple[bool, str, str]:
+def login_user(username: str, password: str, shard: Optional[str] = None) -> Tuple[bool, str, str]:
     """
     Returns (success, role, message)
     """
-    user = database.get_user(username)
+    user = database.get_user(username, shard)
     if not user:
         return False, "", "User not found."
     stored_hash = user["password_hash"]
@@ -117,23 +444,63 @@ def predict_grade(data: Dict[str, Any]) -> Tuple[str, Dict[str, float]]:
     return str(pred_label), prob_map
 
 
+def predict_grades_batch(X: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """
+    Scores a (n, 5) feature matrix in one model call.
+    Returns (predicted grades, probability matrix with columns in model class order).
+    """
+    _ensure_model()
+    assert _MODEL is not None and _CLASSES is not None
+    if len(X) == 0:
+        return [], np.empty((0, len(_CLASSES)))
+    probs = _MODEL.predict_proba(X)
+    labels = np.asarray(_CLASSES, dtype=object)[np.argmax(probs, axis=1)]
+    return [str(label) for label in labels], probs
+
+
+# (feature, below this value, recommendation), shared by the single-row and batch paths
+_RECOMMENDATION_RULES: List[Tuple[str, float, str]] = [
+    ("attendance", 75, "Improve attendance to at least 85% for better outcomes."),
+    ("marks", 70, "Focus on core subjects to raise marks above 80%."),
+    ("assignments", 70, "Complete and revise assignments to boost assignment score."),
+    ("study_hours", 10, "Increase study hours to at least 12-15 hours/week."),
+    ("extracurriculars", 3, "Engage in extracurricular activities to build balance and soft skills."),
+]
+_NO_RECOMMENDATIONS = "Great job! Maintain consistency to keep your performance high."
+
+
 def get_recommendations(data: Dict[str, Any]) -> List[str]:
     recs: List[str] = []
-    if data["attendance"] < 75:
-        recs.append("Improve attendance to at least 85% for better outcomes.")
-    if data["marks"] < 70:
-        recs.append("Focus on core subjects to raise marks above 80%.")
-    if data["assignments"] < 70:
-        recs.append("Complete and revise assignments to boost assignment score.")
-    if data["study_hours"] < 10:
-        recs.append("Increase study hours to at least 12-15 hours/week.")
-    if data["extracurriculars"] < 3:
-        recs.append("Engage in extracurricular activities to build balance and soft skills.")
+    for feature, threshold, message in _RECOMMENDATION_RULES:
+        if data[feature] < threshold:
+            recs.append(message)
     if not recs:
-        recs.append("Great job! Maintain consistency to keep your performance high.")
+        recs.append(_NO_RECOMMENDATIONS)
     return recs
 
 
+@functools.lru_cache(maxsize=1)
+def _recommendation_table(separator: str) -> np.ndarray:
+    # Joined recommendations for each of the 2**len(rules) combinations of triggered rules
+    table = []
+    for code in range(2 ** len(_RECOMMENDATION_RULES)):
+        recs = [msg for bit, (_, _, msg) in enumerate(_RECOMMENDATION_RULES) if code >> bit & 1]
+        table.append(separator.join(recs) if recs else _NO_RECOMMENDATIONS)
+    return np.asarray(table, dtype=object)
+
+
+def get_recommendations_batch(X: np.ndarray, separator: str = "; ") -> np.ndarray:
+    """
+    Vectorized get_recommendations over a (n, 5) feature matrix: each row's triggered
+    rules form a bit code that indexes a precomputed table of joined recommendations.
+    """
+    X = np.asarray(X, dtype=float)
+    codes = np.zeros(len(X), dtype=np.int64)
+    for bit, (feature, threshold, _) in enumerate(_RECOMMENDATION_RULES):
+        codes |= (X[:, FEATURES.index(feature)] < threshold).astype(np.int64) << bit
+    return _recommendation_table(separator)[codes]
+
+
 def compute_risk(data: Dict[str, Any], prob_map: Optional[Dict[str, float]] = None) -> Tuple[float, str, List[str]]:
     """
     Computes a risk score (0-1), a categorical level, and mitigation tips.
@@ -183,6 +550,181 @@ def compute_risk(data: Dict[str, Any], prob_map: Optional[Dict[str, float]] = No
     return risk, level, tips
 
 
+def compute_risk_batch(X: np.ndarray, probs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized compute_risk over a (n, 5) feature matrix in FEATURES order.
+    probs, if given, is a (n, 4) probability matrix with columns in GRADES order.
+    Returns (risk scores, risk levels); the tips are not computed here.
+    """
+    X = np.asarray(X, dtype=float)
+    risk = np.zeros(len(X))
+    if probs is not None:
+        risk += probs[:, GRADES.index("D")] * 1.0
+        risk += probs[:, GRADES.index("C")] * 0.5
+    att, marks, asg, study, extra = (X[:, i] for i in range(len(FEATURES)))
+    risk += np.where(att < 75, 0.20, 0.0)
+    risk += np.where(marks < 60, 0.25, 0.0)
+    risk += np.where(asg < 60, 0.20, 0.0)
+    risk += np.where(study < 8, 0.10, 0.0)
+    risk += np.where(extra < 2, 0.05, 0.0)
+    risk = np.clip(risk, 0.0, 1.0)
+    levels = np.where(risk >= 0.70, "High", np.where(risk >= 0.40, "Medium", "Low"))
+    return risk, levels
+
+
+def _grade_probs(probs: np.ndarray) -> np.ndarray:
+    # Reorders predict_proba columns from model class order to GRADES order
+    assert _CLASSES is not None
+    return probs[:, [_CLASSES.index(g) for g in GRADES]]
+
+
+# Per-prediction explanations (Saabas tree-path contributions)
+def _build_explainer() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Precomputes, for every node of every tree, the summed probability changes along the
+    path from the root to that node, attributed to the feature each split used.
+    A prediction's contributions are then just the rows for the leaves it lands in.
+    Returns (bias, path_contributions stacked over all trees, per-tree row offsets).
+    """
+    assert _MODEL is not None
+    estimators = getattr(_MODEL, "estimators_", None)
+    if not estimators or not hasattr(estimators[0], "tree_"):
+        raise TypeError("Explanations need a tree ensemble model (RandomForest/ExtraTrees).")
+    n_features = len(FEATURES)
+    n_classes = len(_MODEL.classes_)
+    blocks = []
+    offsets = []
+    bias = np.zeros(n_classes)
+    total_nodes = 0
+    for est in estimators:
+        tree = est.tree_
+        values = tree.value[:, 0, :].astype(float)
+        values /= np.maximum(values.sum(axis=1, keepdims=True), 1e-12)
+        path = np.zeros((tree.node_count, n_features, n_classes))
+        # Walk the tree level by level; each level is one vectorized update
+        frontier = np.array([0])
+        while frontier.size:
+            parents = frontier[tree.children_left[frontier] != -1]
+            split_on = tree.feature[parents]
+            for children in (tree.children_left[parents], tree.children_right[parents]):
+                path[children] = path[parents]
+                path[children, split_on, :] += values[children] - values[parents]
+            frontier = np.concatenate([tree.children_left[parents], tree.children_right[parents]])
+        blocks.append(path.reshape(tree.node_count, n_features * n_classes))
+        offsets.append(total_nodes)
+        total_nodes += tree.node_count
+        bias += values[0]
+    return bias / len(estimators), np.vstack(blocks), np.asarray(offsets)
+
+
+def explain_batch(X: np.ndarray, chunk_size: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Feature attributions for a (n, 5) feature matrix, vectorized across trees and rows.
+    Returns (bias, contributions): bias is (4,) and contributions is (n, 5, 4), both in
+    GRADES order, with bias + contributions.sum(axis=1) equal to predict_proba.
+    """
+    global _EXPLAINER
+    _ensure_model()
+    assert _MODEL is not None and _CLASSES is not None
+    if _EXPLAINER is None:
+        _EXPLAINER = _build_explainer()
+    bias, path_contributions, offsets = _EXPLAINER
+    X = np.asarray(X, dtype=float)
+    n_trees = len(offsets)
+    out = np.empty((len(X), len(FEATURES) * len(_CLASSES)))
+    for start in range(0, len(X), chunk_size):
+        leaves = _MODEL.apply(X[start:start + chunk_size]) + offsets
+        out[start:start + chunk_size] = path_contributions[leaves].sum(axis=1) / n_trees
+    contributions = out.reshape(len(X), len(FEATURES), len(_CLASSES))
+    order = [_CLASSES.index(g) for g in GRADES]
+    return bias[order], contributions[:, :, order]
+
+
+@functools.lru_cache(maxsize=1024)
+def _explain_cached(base: Tuple[float, ...], grade: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    bias, contributions = explain_batch(np.array([base]))
+    probs = bias + contributions[0].sum(axis=0)
+    prob_map = {g: float(p) for g, p in zip(GRADES, probs)}
+    attributions = {f: float(c) for f, c in zip(FEATURES, contributions[0][:, GRADES.index(grade)])}
+    return prob_map, attributions
+
+
+def explain_prediction(data: Dict[str, Any], grade: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Explains one grade for one input: how much each feature moved the probability of
+    that grade away from the model's baseline. grade defaults to predict_grade's answer;
+    pass the grade already shown so the explanation matches it (the argmax of the path
+    sums can break exact probability ties differently from predict_proba).
+    Returns {"grade", "probabilities", "baseline", "attributions"}; cached per input vector and grade.
+    """
+    _ensure_model()
+    if grade is None:
+        grade, _ = predict_grade(data)
+    base = tuple(float(data[f]) for f in FEATURES)
+    prob_map, attributions = _explain_cached(base, grade)
+    assert _EXPLAINER is not None
+    baseline = float(_EXPLAINER[0][[_CLASSES.index(g) for g in GRADES]][GRADES.index(grade)])
+    return {"grade": grade, "probabilities": prob_map, "baseline": baseline, "attributions": attributions}
+
+
+# What-if explorer
+WHAT_IF_SPANS: Dict[str, float] = {
+    "attendance": 20.0,
+    "marks": 20.0,
+    "assignments": 20.0,
+    "study_hours": 10.0,
+    "extracurriculars": 5.0,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _what_if_cached(base: Tuple[float, ...], x_feature: str, y_feature: str, steps: int) -> Dict[str, Any]:
+    xi, yi = FEATURES.index(x_feature), FEATURES.index(y_feature)
+    axes = []
+    for feature, idx in ((x_feature, xi), (y_feature, yi)):
+        lo, hi = FEATURE_RANGES[feature]
+        span = WHAT_IF_SPANS[feature]
+        axes.append(np.linspace(max(lo, base[idx] - span), min(hi, base[idx] + span), steps))
+    xs, ys = axes
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    X = np.tile(np.asarray(base, dtype=float), (grid_x.size, 1))
+    X[:, xi] = grid_x.ravel()
+    X[:, yi] = grid_y.ravel()
+
+    # One model call for the whole grid
+    grades, probs = predict_grades_batch(X)
+    risk, levels = compute_risk_batch(X, _grade_probs(probs))
+    result = {
+        "x_feature": x_feature,
+        "y_feature": y_feature,
+        "x": X[:, xi],
+        "y": X[:, yi],
+        "grade": np.asarray(grades),
+        "risk": risk,
+        "risk_level": levels,
+    }
+    for value in result.values():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)  # shared between callers through the cache
+    return result
+
+
+def what_if_grid(
+    data: Dict[str, Any], x_feature: str = "study_hours", y_feature: str = "attendance", steps: int = 50
+) -> Dict[str, Any]:
+    """
+    Predicts grade and risk over a steps x steps grid around the student's inputs,
+    varying x_feature and y_feature within WHAT_IF_SPANS (clipped to FEATURE_RANGES).
+    Returns flat arrays x, y, grade, risk, risk_level of length steps**2.
+    Results are cached per input vector and feature pair.
+    """
+    if x_feature == y_feature or x_feature not in FEATURES or y_feature not in FEATURES:
+        raise ValueError("x_feature and y_feature must be two different input features.")
+    _ensure_model()
+    base = tuple(float(data[f]) for f in FEATURES)
+    return _what_if_cached(base, x_feature, y_feature, int(steps))
+
+
 # Student CRUD wrappers (rely on DB)
 def add_student(
     name: str,
@@ -192,9 +734,10 @@ def add_student(
     study_hours: float,
     extracurriculars: float,
     predicted_grade: str,
+    shard: Optional[str] = None,
 ) -> int:
     return database.add_student(
-        name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade
+        name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade, shard
     )
 
 
@@ -207,19 +750,456 @@ def update_student(
     study_hours: float,
     extracurriculars: float,
     predicted_grade: str,
+    shard: Optional[str] = None,
 ) -> bool:
     return database.update_student(
-        student_id, name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade
+        student_id, name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade, shard
     )
 
 
-def remove_student(student_id: int) -> bool:
-    return database.remove_student(student_id)
+def remove_student(student_id: int, shard: Optional[str] = None) -> bool:
+    return database.remove_student(student_id, shard)
+
+
+def get_all_students(shard: Optional[str] = None, include_archived: bool = False) -> List[Dict[str, Any]]:
+    return database.get_all_students(shard, include_archived)
+
+
+def get_students_by_name(name: str, shard: Optional[str] = None, include_archived: bool = False) -> List[Dict[str, Any]]:
+    return database.get_students_by_name(name, shard, include_archived)
+
+
+def list_archives(shard: Optional[str] = None) -> List[str]:
+    return database.list_archives(shard)
+
+
+def start_maintenance(shard: Optional[str] = None) -> bool:
+    return database.start_maintenance(shard=shard)
+
+
+# Reports read from the in-memory columnar store rather than SELECT * per render
+def get_report_columns(shard: Optional[str] = None, snapshot_dir: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Column arrays for the Reports tab: id, name, the five metrics, predicted_grade,
+    and risk_score/risk_level computed vectorized with the stored grade as the
+    (one-hot) probability, as the Reports tab has always done.
+    With snapshot_dir, the same columns are read from an Arrow snapshot instead of the live DB.
+    """
+    if snapshot_dir is not None:
+        return analytics.snapshot_columns(snapshot_dir)
+    cols = analytics.get_store(shard).columns()
+    return _with_risk_columns(cols)
+
+
+def get_cohort_percentiles(data: Dict[str, Any], grade: str, shard: Optional[str] = None) -> Dict[str, float]:
+    """
+    Percentile (0-100) of each input and of the risk score among all stored records.
+    """
+    return analytics.get_ranker(shard).percentiles(data, grade)
+
+
+def get_data_quality(shard: Optional[str] = None, isolation: bool = True) -> Dict[str, Any]:
+    """
+    Data-quality checks over every stored record, read from the columnar store.
+    See analytics.check_data_quality for the result layout.
+    """
+    return analytics.check_data_quality(analytics.get_store(shard).columns(), isolation=isolation)
+
+
+def benchmark_data_quality(n: int = 1_000_000, isolation: bool = True) -> Dict[str, Any]:
+    """
+    Runs the data-quality checks on n synthetic records with a few planted problems
+    (duplicates, impossible combinations, extreme values).
+    """
+    rng = np.random.default_rng(7)
+    X, y = _generate_synthetic_dataset(n, seed=7)
+    X = X.astype(np.float32)
+    planted = rng.choice(n, max(1, n // 1000), replace=False)
+    X[planted[0::3], 0], X[planted[0::3], 3] = 100.0, 0.0
+    X[planted[1::3], 3] = 79.0
+    name_code = rng.integers(0, max(1, n // 20), size=n).astype(np.int32)
+    dup_src = planted[2::3]
+    dup_dst = rng.choice(n, len(dup_src), replace=False)
+    X[dup_dst], name_code[dup_dst] = X[dup_src], name_code[dup_src]
+    cols: Dict[str, np.ndarray] = {"id": np.arange(1, n + 1, dtype=np.int32)}
+    for i, f in enumerate(FEATURES):
+        cols[f] = X[:, i]
+    cols["grade_code"] = np.searchsorted(np.asarray(GRADES), y).astype(np.uint8)
+    cols["name_code"] = name_code
+    cols["name"] = np.char.add("student", name_code.astype(str)).astype(object)
+    return analytics.check_data_quality(cols, isolation=isolation)
+
+
+def _with_risk_columns(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    codes = cols.pop("grade_code")
+    X = np.column_stack([cols[f].astype(float) for f in FEATURES]) if len(codes) else np.empty((0, len(FEATURES)))
+    risk, levels = compute_risk_batch(X, np.eye(len(GRADES))[codes])
+    out: Dict[str, np.ndarray] = {"id": cols["id"], "name": cols["name"]}
+    for f in FEATURES:
+        # float32 storage; round so 78.3 does not display as 78.30000305
+        out[f] = np.round(cols[f].astype(float), 4)
+    out["predicted_grade"] = np.asarray(GRADES, dtype=object)[codes]
+    out["risk_score"] = risk
+    out["risk_level"] = levels
+    return out
+
+
+# Change feed for caches and derived views over students
+def changes_since(seq: int, limit: int = 10000, shard: Optional[str] = None) -> Dict[str, Any]:
+    return database.changes_since(seq, limit, shard)
+
+
+def compact_changes(max_rows: int = 100000, shard: Optional[str] = None) -> Dict[str, int]:
+    return database.compact_changes(max_rows, shard)
+
+
+# Cross-shard reports (fan-out over per-tenant databases)
+def list_shards() -> List[str]:
+    return database.list_shards()
+
+
+def get_class_summary_all_shards(shards: Optional[List[str]] = None) -> Dict[str, Any]:
+    return database.get_class_summary_all_shards(shards)
+
+
+# Bulk re-grade after a model change
+def regrade_all(
+    chunk_size: int = 5000,
+    after_id: int = 0,
+    shard: Optional[str] = None,
+    progress: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Re-scores every stored record with the current model, chunk by chunk.
+    Each chunk is one vectorized predict call and one transaction, so an interrupted
+    run can resume from the reported last_id via after_id.
+    progress, if given, is called as progress(done, total, last_id) after each chunk.
+    Returns counts of processed/changed rows and the old->new grade transitions.
+    """
+    total = database.count_students(after_id, shard)
+    done = 0
+    changed = 0
+    last_id = after_id
+    transitions: Dict[str, int] = {}
+    for rows in database.iter_student_chunks(chunk_size, after_id=after_id, shard=shard):
+        grades, _ = predict_grades_batch(_rows_to_matrix(rows))
+        updates = [
+            (grade, row["id"], row["predicted_grade"], *(row[f] for f in FEATURES))
+            for row, grade in zip(rows, grades)
+            if grade != row["predicted_grade"]
+        ]
+        if updates:
+            # Rows edited since this chunk was read are skipped and not counted
+            applied = set(database.update_grades(updates, shard))
+            for grade, student_id, old_grade, *_ in updates:
+                if student_id in applied:
+                    key = f"{old_grade}->{grade}"
+                    transitions[key] = transitions.get(key, 0) + 1
+                    changed += 1
+        done += len(rows)
+        last_id = rows[-1]["id"]
+        if progress is not None:
+            progress(done, total, last_id)
+    return {
+        "processed": done,
+        "changed": changed,
+        "last_id": last_id,
+        "transitions": dict(sorted(transitions.items(), key=lambda item: -item[1])),
+    }
+
+
+# Headless batch scoring: python -m backend score
+def _score_matrix(X: np.ndarray) -> Dict[str, np.ndarray]:
+    grades, probs = predict_grades_batch(X)
+    probs = _grade_probs(probs)
+    risk, levels = compute_risk_batch(X, probs)
+    out: Dict[str, np.ndarray] = {"predicted_grade": np.asarray(grades, dtype=object)}
+    for i, g in enumerate(GRADES):
+        out[f"prob_{g}"] = probs[:, i]
+    out["risk_score"] = risk
+    out["risk_level"] = levels
+    out["recommendations"] = get_recommendations_batch(X)
+    return out
+
+
+def _init_scoring_worker(model_path: str) -> None:
+    # Only reached under spawn/forkserver; with fork the parent's loaded model is inherited.
+    # mmap_mode shares the tree arrays of an uncompressed model file between workers.
+    import joblib
+
+    if _MODEL is None:
+        _set_model(joblib.load(model_path, mmap_mode="r"))
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 50000,
+    output_format: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Scores a CSV of student records without the UI. The input needs the five feature
+    columns; any other columns (id, name, ...) are passed through.
+    Chunks are read lazily and scored on a process pool (in input order, with at most
+    2 * workers chunks in flight), and results are streamed to CSV or Parquet (chosen by
+    output_format or the output extension). Pass-through columns are kept as text.
+    Returns rows, seconds and rows_per_sec.
+    """
+    import multiprocessing
+
+    import pandas as pd
+
+    fmt = output_format or ("parquet" if output_path.endswith(".parquet") else "csv")
+    workers = workers or os.cpu_count() or 1
+    _ensure_model()  # loaded before the pool starts so forked workers inherit it
+
+    started = time.perf_counter()
+    # Pass-through columns are read as text so every chunk has the same schema (a column
+    # that is empty in one chunk would otherwise be float there and text elsewhere)
+    passthrough = [c for c in pd.read_csv(input_path, nrows=0).columns if c not in FEATURES]
+    reader = pd.read_csv(input_path, chunksize=chunk_size, dtype={c: str for c in passthrough})
+    rows = 0
+    parquet_writer = None
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pool = None
+    if workers > 1:
+        pool = ctx.Pool(workers, initializer=_init_scoring_worker, initargs=(os.path.abspath(MODEL_PATH),))
+    # At most this many chunks are read or scored but not yet written, however slow the output is
+    max_in_flight = 2 * workers
+    in_flight: Deque[Tuple[Any, Any]] = collections.deque()
+
+    def write(frame: Any, result: Dict[str, np.ndarray]) -> None:
+        nonlocal rows, parquet_writer
+        scored = frame.reset_index(drop=True).assign(**result)
+        if fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if parquet_writer is None:
+                schema = pa.schema(
+                    [pa.field(f.name, pa.string()) if f.name in passthrough else f for f in table.schema]
+                )
+                parquet_writer = pq.ParquetWriter(output_path, schema)
+            parquet_writer.write_table(table.cast(parquet_writer.schema))
+        else:
+            scored.to_csv(output_path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+        rows += len(scored)
+
+    try:
+        for frame in reader:
+            X = frame[FEATURES].to_numpy(dtype=float)
+            if pool is None:
+                write(frame, _score_matrix(X))
+                continue
+            in_flight.append((frame, pool.apply_async(_score_matrix, (X,))))
+            if len(in_flight) >= max_in_flight:
+                done_frame, pending = in_flight.popleft()
+                write(done_frame, pending.get())
+        while in_flight:
+            done_frame, pending = in_flight.popleft()
+            write(done_frame, pending.get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if parquet_writer is not None:
+            parquet_writer.close()
+    elapsed = time.perf_counter() - started
+    return {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rows / elapsed, 1) if elapsed else None}
+
+
+def score_scaling(input_path: str, max_workers: Optional[int] = None, chunk_size: int = 50000) -> List[Dict[str, Any]]:
+    """
+    Runs score_file with 1, 2, 4, ... up to max_workers processes and reports rows/sec for each.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = sorted({1, max_workers, *[2**i for i in range(max_workers.bit_length()) if 2**i <= max_workers]})
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in counts:
+            result = score_file(input_path, os.path.join(tmp, f"scored-{n}.csv"), workers=n, chunk_size=chunk_size)
+            result["workers"] = n
+            report.append(result)
+    base = report[0]["rows_per_sec"] or 1.0
+    for r in report:
+        r["speedup"] = round((r["rows_per_sec"] or 0.0) / base, 2)
+    return report
+
+
+# Startup budget
+HEAVY_MODULES = ("sklearn", "joblib", "pandas", "altair", "reportlab")
+IMPORT_BUDGET_MS = float(os.environ.get("STUDENT_TRACKER_IMPORT_BUDGET_MS", "400"))
+
+
+def profile_imports(modules: Tuple[str, ...] = ("backend", "database")) -> Dict[str, Any]:
+    """
+    Imports modules in a fresh interpreter under `-X importtime` and returns the total
+    import time, the slowest top-level imports and any heavy modules that were pulled in.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    top_level: List[Tuple[str, int]] = []
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        name = package.rstrip()
+        loaded.add(name.strip().split(".")[0])
+        if not name.startswith("  "):
+            top_level.append((name.strip(), int(cumulative)))
+    total_ms = sum(us for _, us in top_level) / 1000
+    slowest = sorted(top_level, key=lambda item: -item[1])[:10]
+    return {
+        "total_ms": round(total_ms, 1),
+        "slowest": [(name, round(us / 1000, 1)) for name, us in slowest],
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+    }
+
+
+# Command line entry point: python -m backend <command>
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend", description="Student tracker maintenance commands.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_retrain = sub.add_parser("retrain", help="Retrain the grade model on stored student records.")
+    p_retrain.add_argument("--chunk-size", type=int, default=5000)
+    p_retrain.add_argument("--n-trees", type=int, default=DEFAULT_MODEL_PARAMS["n_estimators"], help="Trees grown this run, spread over all chunks.")
+    p_retrain.add_argument("--max-trees", type=int, default=2 * DEFAULT_MODEL_PARAMS["n_estimators"], help="Trees kept after a warm start.")
+    p_retrain.add_argument("--holdout-every", type=int, default=10)
+    p_retrain.add_argument("--warm-start", action="store_true", help="Grow the existing model instead of replacing it.")
+    p_retrain.add_argument("--model-path", default=None)
+
+    p_optimize = sub.add_parser("optimize", help="Search compact models and print an accuracy/size/latency report.")
+    p_optimize.add_argument("--n-train", type=int, default=2000)
+    p_optimize.add_argument("--n-test", type=int, default=2000)
+    p_optimize.add_argument("--tolerance", type=float, default=0.01, help="Allowed accuracy loss vs the best candidate.")
+    p_optimize.add_argument("--save", action="store_true", help="Publish the chosen model to the model path.")
+    p_optimize.add_argument("--model-path", default=None)
+
+    p_regrade = sub.add_parser("regrade", help="Re-score all stored records with the current model.")
+    p_regrade.add_argument("--chunk-size", type=int, default=5000)
+    p_regrade.add_argument("--resume-after", type=int, default=0, help="Skip records with id <= this (last_id of a prior run).")
+    p_regrade.add_argument("--shard", default=None)
+
+    p_snapshot = sub.add_parser("snapshot", help="Write an Arrow IPC snapshot of students for offline analytics.")
+    p_snapshot.add_argument("--dir", default=analytics.SNAPSHOT_DIR)
+    p_snapshot.add_argument("--full", action="store_true", help="Rewrite the base instead of adding a delta.")
+    p_snapshot.add_argument("--shard", default=None)
+
+    p_score = sub.add_parser("score", help="Score a CSV of student records without the UI.")
+    p_score.add_argument("input", help="CSV with attendance, marks, assignments, study_hours, extracurriculars columns.")
+    p_score.add_argument("-o", "--output", default="scored.csv", help="Output path (.csv or .parquet).")
+    p_score.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    p_score.add_argument("--chunk-size", type=int, default=50000)
+    p_score.add_argument("--format", choices=["csv", "parquet"], default=None)
+    p_score.add_argument("--scaling", action="store_true", help="Report rows/sec from 1 to --workers processes.")
+
+    p_quality = sub.add_parser("quality", help="Flag suspicious, outlying and duplicate student records.")
+    p_quality.add_argument("--shard", default=None)
+    p_quality.add_argument("--no-isolation", action="store_true", help="Skip the isolation-forest check.")
+    p_quality.add_argument("-o", "--output", default=None, help="Write the flagged rows to this CSV.")
+    p_quality.add_argument("--synthetic", type=int, default=None, metavar="N", help="Time the checks on N generated rows.")
+
+    p_importtime = sub.add_parser("importtime", help="Fail when startup imports exceed the time budget.")
+    p_importtime.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p_importtime.add_argument("--modules", nargs="+", default=["backend", "database"])
+
+    args = parser.parse_args(argv)
+    if args.command == "retrain":
+        try:
+            metrics = retrain_model(
+                chunk_size=args.chunk_size,
+                n_trees=args.n_trees,
+                holdout_every=args.holdout_every,
+                warm_start=args.warm_start,
+                model_path=args.model_path,
+                max_trees=args.max_trees,
+            )
+        except ValueError as exc:
+            print(f"Retrain failed: {exc}")
+            return 1
+        for key, value in metrics.items():
+            print(f"{key}: {value}")
+    elif args.command == "optimize":
+        report = optimize_model(
+            n_train=args.n_train,
+            n_test=args.n_test,
+            accuracy_tolerance=args.tolerance,
+            save=args.save,
+            model_path=args.model_path,
+        )
+        pareto = {r["model"] for r in report["pareto"]}
+        print(f"{'model':<36} {'accuracy':>8} {'size_kb':>9} {'load_ms':>8} {'p99_ms':>7}  pareto")
+        for r in sorted(report["results"], key=lambda r: -r["accuracy"]):
+            mark = "*" if r["model"] in pareto else ""
+            print(
+                f"{r['model']:<36} {r['accuracy']:>8.4f} {r['size_kb']:>9.1f} "
+                f"{r['load_ms']:>8.2f} {r['p99_ms']:>7.2f}  {mark}"
+            )
+        print(f"chosen: {report['chosen']['model']}")
+        if report["saved_to"]:
+            print(f"saved to: {report['saved_to']}")
+    elif args.command == "regrade":
+        def report_progress(done: int, total: int, last_id: int) -> None:
+            print(f"{done}/{total} records (last_id={last_id})", flush=True)
 
+        summary = regrade_all(
+            chunk_size=args.chunk_size, after_id=args.resume_after, shard=args.shard, progress=report_progress
+        )
+        print(f"processed: {summary['processed']}, changed: {summary['changed']}, last_id: {summary['last_id']}")
+        for transition, count in summary["transitions"].items():
+            print(f"  {transition}: {count}")
+    elif args.command == "snapshot":
+        manifest = analytics.write_snapshot(args.dir, full=args.full, shard=args.shard)
+        for part in manifest["parts"]:
+            print(f"{part['kind']:<5} {part['rows']:>9} rows  {os.path.join(args.dir, part['file'])}")
+        print(f"snapshot at change seq {manifest['seq']}")
+    elif args.command == "score":
+        if args.scaling:
+            for r in score_scaling(args.input, args.workers, args.chunk_size):
+                print(f"{r['workers']:>3} workers: {r['rows_per_sec']:>12,.0f} rows/sec  (x{r['speedup']})")
+        else:
+            result = score_file(args.input, args.output, args.workers, args.chunk_size, args.format)
+            print(f"scored {result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/sec) -> {args.output}")
+    elif args.command == "quality":
+        if args.synthetic:
+            report = benchmark_data_quality(args.synthetic, isolation=not args.no_isolation)
+        else:
+            report = get_data_quality(args.shard, isolation=not args.no_isolation)
+        print(f"{report['flagged']} of {report['rows']} records flagged in {report['seconds']}s")
+        for check, count in report["counts"].items():
+            print(f"  {check:<28} {count}")
+        if args.output:
+            import pandas as pd
 
-def get_all_students() -> List[Dict[str, Any]]:
-    return database.get_all_students()
+            pd.DataFrame(report["columns"]).to_csv(args.output, index=False)
+            print(f"flagged rows written to {args.output}")
+    elif args.command == "importtime":
+        report = profile_imports(tuple(args.modules))
+        for name, ms in report["slowest"]:
+            print(f"{ms:>8.1f} ms  {name}")
+        print(f"total: {report['total_ms']} ms (budget {args.budget_ms} ms)")
+        failed = False
+        if report["heavy_modules"]:
+            print(f"FAIL: heavy modules imported at startup: {', '.join(report['heavy_modules'])}")
+            failed = True
+        if report["total_ms"] > args.budget_ms:
+            print("FAIL: import time exceeds budget")
+            failed = True
+        return 1 if failed else 0
+    return 0
 
 
-def get_students_by_name(name: str) -> List[Dict[str, Any]]:
-    return database.get_students_by_name(name)
+if __name__ == "__main__":
+    raise SystemExit(main())
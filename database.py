@@ -1,17 +1,57 @@
 #Set-ExecutionPolicy -Scope Process -ExecutionPolicy Bypass
 #..venv\Scripts\Activate.ps1
 import sqlite3
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Callable, TypeVar
 from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+import argparse
+import atexit
+import glob
+import hashlib
 import os
+import queue
+import re
+import threading
+import time
 
 DB_PATH = os.environ.get("STUDENT_TRACKER_DB_PATH", "student_tracker.db")
+# Per-tenant (school/cohort) databases live here as <shard>.db; shard=None means DB_PATH
+SHARD_DIR = os.environ.get("STUDENT_TRACKER_SHARD_DIR", "shards")
+
+T = TypeVar("T")
+
+# Schema is created on first connection rather than at import time
+_READY_PATHS: set = set()
+_READY_LOCK = threading.Lock()
+
+
+def shard_path(shard: Optional[str] = None) -> str:
+    if shard is None:
+        return DB_PATH
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", shard)
+    if safe != shard:
+        # Distinct keys can sanitise to the same name ("school a", "school_a"); a hash of
+        # the original key keeps their files apart. Clean keys keep their plain file name.
+        safe = f"{safe}-{hashlib.sha1(shard.encode('utf-8')).hexdigest()[:10]}"
+    return os.path.join(SHARD_DIR, f"{safe}.db")
+
+
+def shard_for(key: str, n_shards: int) -> str:
+    """
+    Stable hash routing for keys without an explicit tenant, e.g. shard_for(username, 8).
+    """
+    bucket = int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % n_shards
+    return f"shard-{bucket:02d}"
+
+
+def list_shards() -> List[str]:
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(SHARD_DIR, "*.db")))
 
 
 @contextmanager
-def get_conn():
+def _open_conn(path: str):
     # check_same_thread=False allows use across Streamlit threads safely when each function opens/closes
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(path, check_same_thread=False)
     try:
         conn.row_factory = sqlite3.Row
         yield conn
@@ -19,8 +59,23 @@ def get_conn():
         conn.close()
 
 
-def create_tables() -> None:
-    with get_conn() as conn:
+@contextmanager
+def get_conn(shard: Optional[str] = None):
+    path = shard_path(shard)
+    if path not in _READY_PATHS:
+        with _READY_LOCK:
+            if path not in _READY_PATHS:
+                create_tables(shard)
+                _READY_PATHS.add(path)
+    with _open_conn(path) as conn:
+        yield conn
+
+
+def create_tables(shard: Optional[str] = None) -> None:
+    path = shard_path(shard)
+    if shard is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _open_conn(path) as conn:
         cur = conn.cursor()
         # Users table: unique username, role is Student or Teacher
         cur.execute(
@@ -45,7 +100,85 @@ def create_tables() -> None:
                 assignments REAL NOT NULL,
                 study_hours REAL NOT NULL,
                 extracurriculars REAL NOT NULL,
-                predicted_grade TEXT NOT NULL CHECK (predicted_grade IN ('A','B','C','D'))
+                predicted_grade TEXT NOT NULL CHECK (predicted_grade IN ('A','B','C','D')),
+                created_at TEXT
+            );
+            """
+        )
+        # Change-data-capture log: one row per INSERT/UPDATE/DELETE on students, carrying
+        # the row's new values (NULL for deletes). AUTOINCREMENT keeps seq monotonic.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS student_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL CHECK (op IN ('INSERT','UPDATE','DELETE')),
+                student_id INTEGER NOT NULL,
+                name TEXT,
+                attendance REAL,
+                marks REAL,
+                assignments REAL,
+                study_hours REAL,
+                extracurriculars REAL,
+                predicted_grade TEXT,
+                changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        # Highest seq dropped by compaction; consumers behind it must reload
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS student_changes_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                truncated_through INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+        cur.execute("INSERT OR IGNORE INTO student_changes_meta (id, truncated_through) VALUES (1, 0)")
+        # The update trigger only fires when a tracked column changes, so schema backfills
+        # such as created_at below never reach the change log. Older databases whose trigger
+        # fires on any UPDATE get it replaced (before the backfill runs).
+        row = cur.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'students_cdc_update'").fetchone()
+        if row is not None and "UPDATE OF" not in row["sql"]:
+            cur.execute("DROP TRIGGER students_cdc_update")
+        # created_at drives archival. Databases from before it existed get the column added;
+        # their rows take the time of their first logged change, or the migration time.
+        if "created_at" not in {r["name"] for r in cur.execute("PRAGMA table_info(students)")}:
+            cur.execute("ALTER TABLE students ADD COLUMN created_at TEXT")
+            cur.execute(
+                """
+                UPDATE students SET created_at = COALESCE(
+                    (SELECT MIN(changed_at) FROM student_changes c WHERE c.student_id = students.id),
+                    CURRENT_TIMESTAMP
+                )
+                """
+            )
+        tracked = "name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade"
+        for op, event, ref in (("INSERT", "INSERT", "NEW"), ("UPDATE", f"UPDATE OF {tracked}", "NEW")):
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS students_cdc_{op.lower()} AFTER {event} ON students
+                BEGIN
+                    INSERT INTO student_changes
+                    (op, student_id, name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade)
+                    VALUES ('{op}', {ref}.id, {ref}.name, {ref}.attendance, {ref}.marks, {ref}.assignments,
+                            {ref}.study_hours, {ref}.extracurriculars, {ref}.predicted_grade);
+                END;
+                """
+            )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS students_cdc_delete AFTER DELETE ON students
+            BEGIN
+                INSERT INTO student_changes (op, student_id) VALUES ('DELETE', OLD.id);
+            END;
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_students_created_at ON students (created_at)")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                task TEXT PRIMARY KEY,
+                last_run TEXT NOT NULL
             );
             """
         )
@@ -53,8 +186,8 @@ def create_tables() -> None:
 
 
 # User operations
-def add_user(username: str, password_hash: str, role: str) -> bool:
-    with get_conn() as conn:
+def add_user(username: str, password_hash: str, role: str, shard: Optional[str] = None) -> bool:
+    with get_conn(shard) as conn:
         cur = conn.cursor()
         try:
             cur.execute(
@@ -67,8 +200,8 @@ def add_user(username: str, password_hash: str, role: str) -> bool:
             return False
 
 
-def get_user(username: str) -> Optional[Dict[str, Any]]:
-    with get_conn() as conn:
+def get_user(username: str, shard: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    with get_conn(shard) as conn:
         cur = conn.cursor()
         cur.execute("SELECT * FROM users WHERE username = ?", (username,))
         row = cur.fetchone()
@@ -77,7 +210,177 @@ def get_user(username: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+# Group commit: concurrent single-row writes share one transaction (and one fsync)
+GROUP_COMMIT = os.environ.get("STUDENT_TRACKER_GROUP_COMMIT", "1") != "0"
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("STUDENT_TRACKER_GROUP_COMMIT_MAX_BATCH", "256"))
+GROUP_COMMIT_MAX_DELAY = float(os.environ.get("STUDENT_TRACKER_GROUP_COMMIT_MAX_DELAY_MS", "5")) / 1000
+# Upper bound on how long a caller waits for its commit before giving up
+GROUP_COMMIT_TIMEOUT = float(os.environ.get("STUDENT_TRACKER_GROUP_COMMIT_TIMEOUT_S", "60"))
+
+
+class GroupCommitWriter:
+    """
+    Background writer for one database file. Callers submit a statement and get a
+    Future that resolves to (lastrowid, rowcount) only after the COMMIT that contains
+    it returns, so a resolved future means the row is durable.
+    Statements are collected until max_batch are queued or max_delay has passed since
+    the first one; each runs in its own savepoint so one failure does not abort the batch.
+    """
+
+    def __init__(self, path: str, max_batch: int = GROUP_COMMIT_MAX_BATCH, max_delay: float = GROUP_COMMIT_MAX_DELAY):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"group-commit:{path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: tuple) -> "Future[tuple]":
+        future: "Future[tuple]" = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _fail_queued(self, exc: BaseException) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and not item[2].done():
+                item[2].set_exception(exc)
+
+    def _collect(self) -> tuple:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        conn = None
+        try:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            stopping = False
+            while not stopping:
+                batch, stopping = self._collect()
+                if batch:
+                    self._commit(conn, batch)
+        except BaseException as exc:
+            # The thread is going away: nothing queued may be left waiting on it.
+            # get_writer replaces a writer whose thread has died.
+            self._fail_queued(exc)
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, params, future in batch:
+                conn.execute("SAVEPOINT item")
+                try:
+                    cur = conn.execute(sql, params)
+                    results.append((future, (cur.lastrowid, cur.rowcount), None))
+                    conn.execute("RELEASE item")
+                except BaseException as exc:
+                    # Includes errors raised before SQLite sees the statement, e.g. an
+                    # OverflowError binding a too-large integer
+                    conn.execute("ROLLBACK TO item")
+                    conn.execute("RELEASE item")
+                    results.append((future, None, exc))
+            conn.execute("COMMIT")
+        except BaseException as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for future, result, exc in results:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+_WRITERS: Dict[str, GroupCommitWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer(shard: Optional[str] = None) -> GroupCommitWriter:
+    path = shard_path(shard)
+    writer = _WRITERS.get(path)
+    if writer is None or not writer.is_alive():
+        with _WRITERS_LOCK:
+            writer = _WRITERS.get(path)
+            if writer is None or not writer.is_alive():
+                with get_conn(shard):
+                    pass  # make sure the schema exists before the writer opens the file
+                writer = GroupCommitWriter(path)
+                _WRITERS[path] = writer
+    return writer
+
+
+def close_writers() -> None:
+    with _WRITERS_LOCK:
+        for writer in _WRITERS.values():
+            writer.close()
+        _WRITERS.clear()
+
+
+atexit.register(close_writers)
+
+
+def _write(sql: str, params: tuple, shard: Optional[str] = None) -> tuple:
+    # Returns (lastrowid, rowcount) once the write is committed
+    if GROUP_COMMIT:
+        return get_writer(shard).submit(sql, params).result(timeout=GROUP_COMMIT_TIMEOUT)
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        conn.commit()
+        return cur.lastrowid, cur.rowcount
+
+
 # Student operations
+_INSERT_STUDENT_SQL = """
+    INSERT INTO students
+    (name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+_UPDATE_STUDENT_SQL = """
+    UPDATE students
+    SET name = ?, attendance = ?, marks = ?, assignments = ?, study_hours = ?, extracurriculars = ?, predicted_grade = ?
+    WHERE id = ?
+"""
+
+
 def add_student(
     name: str,
     attendance: float,
@@ -86,27 +389,22 @@ def add_student(
     study_hours: float,
     extracurriculars: float,
     predicted_grade: str,
+    shard: Optional[str] = None,
 ) -> int:
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO students
-            (name, attendance, marks, assignments, study_hours, extracurriculars, predicted_grade)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                name,
-                attendance,
-                marks,
-                assignments,
-                study_hours,
-                extracurriculars,
-                predicted_grade,
-            ),
-        )
-        conn.commit()
-        return cur.lastrowid
+    lastrowid, _ = _write(
+        _INSERT_STUDENT_SQL,
+        (
+            name,
+            attendance,
+            marks,
+            assignments,
+            study_hours,
+            extracurriculars,
+            predicted_grade,
+        ),
+        shard,
+    )
+    return lastrowid
 
 
 def update_student(
@@ -118,53 +416,597 @@ def update_student(
     study_hours: float,
     extracurriculars: float,
     predicted_grade: str,
+    shard: Optional[str] = None,
 ) -> bool:
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            UPDATE students
-            SET name = ?, attendance = ?, marks = ?, assignments = ?, study_hours = ?, extracurriculars = ?, predicted_grade = ?
-            WHERE id = ?
-            """,
-            (
-                name,
-                attendance,
-                marks,
-                assignments,
-                study_hours,
-                extracurriculars,
-                predicted_grade,
-                student_id,
-            ),
-        )
-        conn.commit()
-        return cur.rowcount > 0
+    _, rowcount = _write(
+        _UPDATE_STUDENT_SQL,
+        (
+            name,
+            attendance,
+            marks,
+            assignments,
+            study_hours,
+            extracurriculars,
+            predicted_grade,
+            student_id,
+        ),
+        shard,
+    )
+    return rowcount > 0
 
 
-def remove_student(student_id: int) -> bool:
-    with get_conn() as conn:
+def remove_student(student_id: int, shard: Optional[str] = None) -> bool:
+    with get_conn(shard) as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM students WHERE id = ?", (student_id,))
         conn.commit()
         return cur.rowcount > 0
 
 
-def get_all_students() -> List[Dict[str, Any]]:
-    with get_conn() as conn:
+def get_all_students(shard: Optional[str] = None, include_archived: bool = False) -> List[Dict[str, Any]]:
+    with get_conn(shard) as conn:
         cur = conn.cursor()
         cur.execute("SELECT * FROM students ORDER BY id DESC")
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        rows = [dict(r) for r in cur.fetchall()]
+    if include_archived:
+        rows = _with_archived(rows, "", (), shard)
+    return rows
 
 
-def get_students_by_name(name: str) -> List[Dict[str, Any]]:
-    with get_conn() as conn:
+def get_students_by_name(
+    name: str, shard: Optional[str] = None, include_archived: bool = False
+) -> List[Dict[str, Any]]:
+    with get_conn(shard) as conn:
         cur = conn.cursor()
         cur.execute("SELECT * FROM students WHERE name = ? ORDER BY id DESC", (name,))
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        rows = [dict(r) for r in cur.fetchall()]
+    if include_archived:
+        rows = _with_archived(rows, "WHERE name = ?", (name,), shard)
+    return rows
+
+
+def get_students_by_grade(grade: str, limit: int = 100, shard: Optional[str] = None) -> List[Dict[str, Any]]:
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM students WHERE predicted_grade = ? ORDER BY id DESC LIMIT ?", (grade, limit))
+        return [dict(r) for r in cur.fetchall()]
+
+
+def update_grades(updates: List[tuple], shard: Optional[str] = None) -> List[int]:
+    """
+    updates: (new_grade, student_id, old_grade, attendance, marks, assignments,
+    study_hours, extracurriculars) tuples, written in one transaction.
+    A row is only updated if its grade and metrics still equal the values the new grade
+    was computed from, so a concurrent edit is never overwritten with a stale grade.
+    Returns the ids actually updated.
+    """
+    applied: List[int] = []
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        for update in updates:
+            cur.execute(
+                """
+                UPDATE students SET predicted_grade = ?
+                WHERE id = ? AND predicted_grade = ? AND attendance = ? AND marks = ?
+                AND assignments = ? AND study_hours = ? AND extracurriculars = ?
+                """,
+                update,
+            )
+            if cur.rowcount:
+                applied.append(update[1])
+        conn.commit()
+    return applied
+
+
+def count_students(after_id: int = 0, shard: Optional[str] = None) -> int:
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM students WHERE id > ?", (after_id,))
+        return int(cur.fetchone()[0])
+
+
+def get_grade_counts(shard: Optional[str] = None) -> Dict[str, int]:
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT predicted_grade, COUNT(*) AS n FROM students GROUP BY predicted_grade")
+        return {r["predicted_grade"]: r["n"] for r in cur.fetchall()}
+
+
+def iter_student_chunks(
+    chunk_size: int = 5000, after_id: int = 0, shard: Optional[str] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Streams the students table in id order, chunk_size rows at a time.
+    Uses keyset pagination so no read transaction is held between chunks.
+    """
+    last_id = after_id
+    while True:
+        with get_conn(shard) as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT * FROM students WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size),
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        last_id = rows[-1]["id"]
+
+
+# Change log
+def get_change_seq(shard: Optional[str] = None) -> int:
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'student_changes'")
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+
+def changes_since(seq: int, limit: int = 10000, shard: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns up to limit changes with seq greater than the given one, oldest first:
+    {"changes": [...], "last_seq": int, "reset": bool}.
+    Pass last_seq back on the next call. reset=True means compaction has dropped
+    changes this consumer never saw: reload the full table, then continue from last_seq.
+    """
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT truncated_through FROM student_changes_meta WHERE id = 1")
+        truncated_through = int(cur.fetchone()[0])
+        if seq < truncated_through:
+            cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'student_changes'")
+            row = cur.fetchone()
+            return {"changes": [], "last_seq": int(row[0]) if row else 0, "reset": True}
+        cur.execute("SELECT * FROM student_changes WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit))
+        changes = [dict(r) for r in cur.fetchall()]
+    last_seq = changes[-1]["seq"] if changes else seq
+    return {"changes": changes, "last_seq": last_seq, "reset": False}
+
+
+def compact_changes(max_rows: int = 100000, shard: Optional[str] = None) -> Dict[str, int]:
+    """
+    Bounds the change log: first drops entries superseded by a later change to the same
+    student (harmless to consumers, who apply row state), then, if still above max_rows,
+    drops the oldest entries and records the watermark so lagging consumers get reset.
+    """
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            DELETE FROM student_changes
+            WHERE seq NOT IN (SELECT MAX(seq) FROM student_changes GROUP BY student_id)
+            """
+        )
+        collapsed = cur.rowcount
+        cur.execute("SELECT COUNT(*) FROM student_changes")
+        excess = int(cur.fetchone()[0]) - max_rows
+        truncated = 0
+        if excess > 0:
+            cur.execute("SELECT seq FROM student_changes ORDER BY seq LIMIT 1 OFFSET ?", (excess - 1,))
+            cutoff = int(cur.fetchone()[0])
+            cur.execute("DELETE FROM student_changes WHERE seq <= ?", (cutoff,))
+            truncated = cur.rowcount
+            cur.execute(
+                "UPDATE student_changes_meta SET truncated_through = MAX(truncated_through, ?) WHERE id = 1",
+                (cutoff,),
+            )
+        conn.commit()
+    return {"collapsed": collapsed, "truncated": truncated}
+
+
+# Archival: old records move out of the live table into one SQLite file per term
+ARCHIVE_DIR = os.environ.get("STUDENT_TRACKER_ARCHIVE_DIR", "archive")
+# Archival is opt-in: archived records leave the teacher's edit and report views.
+# Unset (or 0) means scheduled maintenance never archives.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("STUDENT_TRACKER_ARCHIVE_AFTER_DAYS", "0")) or None
+# Terms are half-years: 2025-H1 is January to June, 2025-H2 July to December
+_TERM_SQL = "strftime('%Y', created_at) || '-H' || (CASE WHEN CAST(strftime('%m', created_at) AS INTEGER) <= 6 THEN 1 ELSE 2 END)"
+_ARCHIVE_COLUMNS = [
+    "id", "name", "attendance", "marks", "assignments", "study_hours", "extracurriculars", "predicted_grade", "created_at",
+]
+
+
+def archive_path(term: str, shard: Optional[str] = None) -> str:
+    base = os.path.splitext(os.path.basename(shard_path(shard)))[0]
+    return os.path.join(ARCHIVE_DIR, base, f"{term}.db")
+
+
+def list_archives(shard: Optional[str] = None) -> List[str]:
+    pattern = os.path.join(os.path.dirname(archive_path("x", shard)), "*.db")
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(pattern))
+
+
+def archive_students(older_than_days: int = 365, shard: Optional[str] = None) -> Dict[str, int]:
+    """
+    Moves records created more than older_than_days ago into per-term archive files,
+    attached to the live connection: each term is an INSERT ... SELECT into the archive,
+    committed, then a DELETE of the copied rows from the live table.
+    Deletes go through the change log, so in-memory stores and snapshots drop the rows too.
+    Ids are never reused (AUTOINCREMENT), so live and archived ids never collide.
+    Returns {term: rows archived}.
+    """
+    moved: Dict[str, int] = {}
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        # One fixed cutoff for the whole run, so the copy and the delete select the same rows
+        cutoff = cur.execute("SELECT datetime('now', ?)", (f"-{int(older_than_days)} days",)).fetchone()[0]
+        cur.execute(f"SELECT DISTINCT {_TERM_SQL} AS term FROM students WHERE created_at < ?", (cutoff,))
+        terms = [r["term"] for r in cur.fetchall()]
+        for term in terms:
+            path = archive_path(term, shard)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cur.execute("ATTACH DATABASE ? AS archive", (path,))
+            try:
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS archive.students (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        attendance REAL NOT NULL,
+                        marks REAL NOT NULL,
+                        assignments REAL NOT NULL,
+                        study_hours REAL NOT NULL,
+                        extracurriculars REAL NOT NULL,
+                        predicted_grade TEXT NOT NULL,
+                        created_at TEXT,
+                        archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    );
+                    """
+                )
+                cur.execute("CREATE INDEX IF NOT EXISTS archive.idx_students_name ON students (name)")
+                conn.commit()
+                where = f"created_at < ? AND {_TERM_SQL} = ?"
+                columns = ", ".join(_ARCHIVE_COLUMNS)
+                # Two transactions, copy first. In WAL mode SQLite does not commit attached
+                # databases atomically, so a single transaction could persist the delete and
+                # lose the copy. This way a crash can at worst leave a row in both files,
+                # and readers prefer the live copy.
+                cur.execute(
+                    f"INSERT OR REPLACE INTO archive.students ({columns}) SELECT {columns} FROM main.students WHERE {where}",
+                    (cutoff, term),
+                )
+                conn.commit()
+                # Only rows whose archived copy is identical: an edit that lands between the
+                # two transactions keeps its row live (and re-archives it next run)
+                same = " AND ".join(f"a.{c} IS main.students.{c}" for c in _ARCHIVE_COLUMNS)
+                cur.execute(
+                    f"DELETE FROM main.students WHERE {where} "
+                    f"AND EXISTS (SELECT 1 FROM archive.students a WHERE {same})",
+                    (cutoff, term),
+                )
+                moved[term] = cur.rowcount
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cur.execute("DETACH DATABASE archive")
+    return moved
+
+
+def _with_archived(rows: List[Dict[str, Any]], where: str, params: tuple, shard: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Appends matching archived rows to live rows, newest id first
+    seen = {r["id"] for r in rows}
+    merged = list(rows)
+    for term in list_archives(shard):
+        with _open_conn(archive_path(term, shard)) as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT {', '.join(_ARCHIVE_COLUMNS)} FROM students {where}", params)
+            merged.extend(dict(r, archived_term=term) for r in cur.fetchall() if r["id"] not in seen)
+    merged.sort(key=lambda r: r["id"], reverse=True)
+    return merged
+
+
+# Maintenance: archival, change-log compaction and planner statistics on a schedule
+MAINTENANCE_INTERVAL_HOURS = float(os.environ.get("STUDENT_TRACKER_MAINTENANCE_INTERVAL_HOURS", "24"))
+# VACUUM rewrites the whole file, so it only runs once this share of pages is free
+VACUUM_FREE_RATIO = float(os.environ.get("STUDENT_TRACKER_VACUUM_FREE_RATIO", "0.2"))
+
+
+def optimize_database(vacuum: Optional[bool] = None, shard: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs ANALYZE and PRAGMA optimize, then VACUUM when forced (vacuum=True) or, with
+    vacuum=None, when the free-page ratio is above VACUUM_FREE_RATIO.
+    Returns file size before/after and whether VACUUM ran.
+    """
+    path = shard_path(shard)
+    with get_conn(shard) as conn:
+        size_before = os.path.getsize(path)
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+        pages = int(conn.execute("PRAGMA page_count").fetchone()[0])
+        free = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+        do_vacuum = vacuum if vacuum is not None else bool(pages) and free / pages > VACUUM_FREE_RATIO
+        if do_vacuum:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"size_before": size_before, "size_after": os.path.getsize(path), "vacuumed": do_vacuum}
+
+
+def run_maintenance(
+    older_than_days: Optional[int] = ARCHIVE_AFTER_DAYS, vacuum: Optional[bool] = None, shard: Optional[str] = None
+) -> Dict[str, Any]:
+    # older_than_days=None skips archival and only compacts and optimizes
+    archived = archive_students(older_than_days, shard) if older_than_days else {}
+    compacted = compact_changes(shard=shard)
+    optimized = optimize_database(vacuum, shard)
+    with get_conn(shard) as conn:
+        conn.execute("INSERT OR REPLACE INTO maintenance_log (task, last_run) VALUES ('maintenance', CURRENT_TIMESTAMP)")
+        conn.commit()
+    return {"archived": archived, "compacted": compacted, **optimized}
+
+
+def _maintenance_due(shard: Optional[str], interval_hours: float) -> float:
+    # Seconds until the next run, measured from the last run recorded in the database
+    with get_conn(shard) as conn:
+        row = conn.execute(
+            "SELECT (julianday('now') - julianday(last_run)) * 86400 FROM maintenance_log WHERE task = 'maintenance'"
+        ).fetchone()
+    if row is None:
+        return 0.0
+    return max(0.0, interval_hours * 3600 - float(row[0]))
+
+
+_MAINTENANCE: Dict[str, threading.Thread] = {}
+_MAINTENANCE_LOCK = threading.Lock()
+_MAINTENANCE_STOP = threading.Event()
+
+
+def start_maintenance(interval_hours: float = MAINTENANCE_INTERVAL_HOURS, shard: Optional[str] = None) -> bool:
+    """
+    Starts a daemon thread that runs run_maintenance every interval_hours (0 disables).
+    It only archives when STUDENT_TRACKER_ARCHIVE_AFTER_DAYS is set.
+    The schedule is kept in the database, so restarting the app does not rerun it early.
+    Safe to call on every Streamlit rerun; returns True if a thread is running.
+    """
+    if interval_hours <= 0:
+        return False
+    path = shard_path(shard)
+    with _MAINTENANCE_LOCK:
+        thread = _MAINTENANCE.get(path)
+        if thread is not None and thread.is_alive():
+            return True
+
+        def loop() -> None:
+            while not _MAINTENANCE_STOP.wait(_maintenance_due(shard, interval_hours)):
+                try:
+                    run_maintenance(shard=shard)
+                except sqlite3.Error:
+                    # Busy or locked: try again on the next tick rather than killing the thread
+                    _MAINTENANCE_STOP.wait(60)
+
+        thread = threading.Thread(target=loop, name=f"maintenance:{path}", daemon=True)
+        _MAINTENANCE[path] = thread
+        thread.start()
+    return True
+
+
+# Cross-shard queries
+def fan_out(fn: Callable[[str], T], shards: Optional[List[str]] = None, max_workers: int = 8) -> Dict[str, T]:
+    """
+    Runs fn(shard) for every shard in parallel and returns {shard: result}.
+    sqlite3 releases the GIL while a query runs, so threads give real parallelism here.
+    """
+    targets = list_shards() if shards is None else shards
+    if not targets:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as pool:
+        return dict(zip(targets, pool.map(fn, targets)))
+
+
+def get_student_aggregates(shard: Optional[str] = None) -> Dict[str, Any]:
+    # Partial aggregates (counts and sums) so shards can be merged exactly
+    with get_conn(shard) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT predicted_grade, COUNT(*) AS n,
+                   SUM(attendance) AS attendance, SUM(marks) AS marks, SUM(assignments) AS assignments,
+                   SUM(study_hours) AS study_hours, SUM(extracurriculars) AS extracurriculars
+            FROM students GROUP BY predicted_grade
+            """
+        )
+        return {r["predicted_grade"]: dict(r) for r in cur.fetchall()}
+
+
+def merge_student_aggregates(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    metrics = ["attendance", "marks", "assignments", "study_hours", "extracurriculars"]
+    grade_counts: Dict[str, int] = {}
+    sums = {m: 0.0 for m in metrics}
+    total = 0
+    for partial in partials:
+        for grade, row in partial.items():
+            grade_counts[grade] = grade_counts.get(grade, 0) + row["n"]
+            total += row["n"]
+            for m in metrics:
+                sums[m] += row[m] or 0.0
+    return {
+        "count": total,
+        "grade_counts": grade_counts,
+        "averages": {m: (sums[m] / total if total else 0.0) for m in metrics},
+    }
+
+
+def get_class_summary_all_shards(shards: Optional[List[str]] = None) -> Dict[str, Any]:
+    per_shard = fan_out(get_student_aggregates, shards)
+    summary = merge_student_aggregates(list(per_shard.values()))
+    summary["per_shard"] = {shard: merge_student_aggregates([p]) for shard, p in per_shard.items()}
+    return summary
+
+
+# Splitting an existing single-file database into shards
+def split_database(
+    source_path: str,
+    tenant_of: Optional[Dict[str, str]] = None,
+    n_shards: int = 4,
+    batch_size: int = 5000,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Copies users and students from source_path into per-tenant shard files.
+    Rows are routed by username/name: tenant_of maps a name to its tenant, and names
+    without a mapping fall back to shard_for(name, n_shards). Student self-entries use
+    the username as name, so a student and their records always land on the same shard.
+    Ids are preserved; the source database is left untouched.
+    Returns {shard: {"users": n, "students": n}}.
+    """
+    mapping = tenant_of or {}
+
+    def route(name: str) -> str:
+        return mapping.get(name) or shard_for(name, n_shards)
+
+    copied: Dict[str, Dict[str, int]] = {}
+    src = sqlite3.connect(source_path)
+    try:
+        src.row_factory = sqlite3.Row
+        student_columns = [
+            "id", "name", "attendance", "marks", "assignments", "study_hours", "extracurriculars", "predicted_grade",
+        ]
+        # Shards are created with created_at already present, so the migration backfill never
+        # runs there: fill it here the same way (first logged change, else now)
+        created_at = ["created_at"] if "created_at" in {r["name"] for r in src.execute("PRAGMA table_info(students)")} else []
+        if src.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_changes'").fetchone():
+            created_at.append("(SELECT MIN(changed_at) FROM student_changes c WHERE c.student_id = students.id)")
+        created_at.append("CURRENT_TIMESTAMP")
+        created_at_expr = f"COALESCE({', '.join(created_at)})" if len(created_at) > 1 else created_at[0]
+        for table, key, columns, selects in (
+            ("users", "username", ["id", "username", "password_hash", "role"], None),
+            ("students", "name", student_columns + ["created_at"], student_columns + [f"{created_at_expr} AS created_at"]),
+        ):
+            cur = src.execute(f"SELECT {', '.join(selects or columns)} FROM {table} ORDER BY id")
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                batches: Dict[str, List[tuple]] = {}
+                for row in rows:
+                    batches.setdefault(route(row[key]), []).append(tuple(row))
+                for shard, batch in batches.items():
+                    with get_conn(shard) as conn:
+                        conn.executemany(
+                            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' for _ in columns)})",
+                            batch,
+                        )
+                        conn.commit()
+                    counts = copied.setdefault(shard, {"users": 0, "students": 0})
+                    counts[table] += len(batch)
+    finally:
+        src.close()
+    return copied
+
+
+def benchmark_writes(submitters: int = 200, per_submitter: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Inserts submitters * per_submitter rows from concurrent threads into a scratch
+    database, once with per-row commits and once through the group-commit writer.
+    """
+    import tempfile
+
+    global DB_PATH, GROUP_COMMIT
+    saved = (DB_PATH, GROUP_COMMIT)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for mode, group_commit in (("per-row commit", False), ("group commit", True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                DB_PATH = os.path.join(tmp, "bench.db")
+                GROUP_COMMIT = group_commit
+                errors = 0
+                errors_lock = threading.Lock()
+                start_gate = threading.Barrier(submitters)
+
+                def submitter(i: int) -> None:
+                    nonlocal errors
+                    start_gate.wait()
+                    for j in range(per_submitter):
+                        try:
+                            add_student(f"bench{i}", 90.0, 80.0, 80.0, 12.0, 3.0, "B")
+                        except sqlite3.OperationalError:
+                            with errors_lock:
+                                errors += 1
+
+                with get_conn() as conn:
+                    # Both modes run in WAL so the comparison measures batching alone
+                    conn.execute("PRAGMA journal_mode=WAL")
+                threads = [threading.Thread(target=submitter, args=(i,)) for i in range(submitters)]
+                started = time.perf_counter()
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - started
+                close_writers()
+                written = count_students()
+                results[mode] = {
+                    "rows": written,
+                    "errors": errors,
+                    "seconds": round(elapsed, 3),
+                    "writes_per_sec": round(written / elapsed, 1),
+                }
+    finally:
+        DB_PATH, GROUP_COMMIT = saved
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python database.py", description="Student tracker database tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_split = sub.add_parser("split", help="Split a single database into per-tenant shard files.")
+    p_split.add_argument("--source", default=DB_PATH)
+    p_split.add_argument("--shards", type=int, default=4, help="Hash buckets for names without a tenant mapping.")
+    p_split.add_argument("--tenant-map", default=None, help="CSV file of name,tenant rows.")
+
+    p_bench = sub.add_parser("bench-writes", help="Compare per-row commits with group commit under concurrency.")
+    p_bench.add_argument("--submitters", type=int, default=200)
+    p_bench.add_argument("--per-submitter", type=int, default=5)
+
+    p_compact = sub.add_parser("compact-changes", help="Bound the size of the student_changes log.")
+    p_compact.add_argument("--max-rows", type=int, default=100000)
+    p_compact.add_argument("--shard", default=None)
+
+    p_maint = sub.add_parser("maintain", help="Archive old records, compact the change log, ANALYZE/optimize/VACUUM.")
+    p_maint.add_argument(
+        "--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archive records older than this (default: no archival)."
+    )
+    p_maint.add_argument("--vacuum", choices=["auto", "always", "never"], default="auto")
+    p_maint.add_argument("--shard", default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == "maintain":
+        vacuum = {"auto": None, "always": True, "never": False}[args.vacuum]
+        result = run_maintenance(args.older_than_days, vacuum, args.shard)
+        for term, n in sorted(result["archived"].items()):
+            print(f"archived {n} records to {archive_path(term, args.shard)}")
+        print(
+            f"compacted change log: {result['compacted']['collapsed']} collapsed, {result['compacted']['truncated']} truncated"
+        )
+        print(
+            f"{'vacuumed' if result['vacuumed'] else 'analyzed'} {shard_path(args.shard)}: "
+            f"{result['size_before']} -> {result['size_after']} bytes"
+        )
+    elif args.command == "compact-changes":
+        result = compact_changes(args.max_rows, args.shard)
+        print(f"collapsed {result['collapsed']} superseded changes, truncated {result['truncated']} old changes")
+    elif args.command == "bench-writes":
+        for mode, r in benchmark_writes(args.submitters, args.per_submitter).items():
+            print(
+                f"{mode:<15} {r['writes_per_sec']:>9.1f} writes/sec  "
+                f"({r['rows']} rows in {r['seconds']}s, {r['errors']} lock errors)"
+            )
+    elif args.command == "split":
+        tenant_of: Dict[str, str] = {}
+        if args.tenant_map:
+            import csv
+
+            with open(args.tenant_map, newline="", encoding="utf-8") as fh:
+                tenant_of = {row[0]: row[1] for row in csv.reader(fh) if len(row) >= 2}
+        copied = split_database(args.source, tenant_of=tenant_of, n_shards=args.shards)
+        for shard, counts in sorted(copied.items()):
+            print(f"{shard_path(shard)}: {counts['users']} users, {counts['students']} students")
+    return 0
 
 
-# Initialize tables on import
-create_tables()
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+PDF_WORKERS = int(os.environ.get("STUDENT_TRACKER_PDF_WORKERS", "2"))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("STUDENT_TRACKER_PDF_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_INPUT_LABELS = [
+    ("Attendance (%)", "attendance"),
+    ("Marks (%)", "marks"),
+    ("Assignments (%)", "assignments"),
+    ("Study Hours (per week)", "study_hours"),
+    ("Extracurriculars (0–10)", "extracurriculars"),
+]
+
+
+@functools.lru_cache(maxsize=1)
+def _static_layout() -> Optional[Dict[str, Any]]:
+    """
+    Layout inputs that do not depend on the record: the reportlab import, page size and
+    the y-position of every line. Computed once per process; the headings themselves
+    are still drawn into each PDF. Returns None when reportlab is not installed.
+    """
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
+    except Exception:
+        return None
+
+    width, height = A4
+    y = height - 25 * mm
+    title_y = y
+    y -= 12 * mm
+    student_y = y
+    y -= 7 * mm
+    record_y = y
+    y -= 10 * mm
+    inputs_header_y = y
+    y -= 7 * mm
+    input_rows: List[Tuple[str, str, float]] = []
+    for label, key in _INPUT_LABELS:
+        input_rows.append((label, key, y))
+        y -= 6 * mm
+    y -= 4 * mm
+    grade_y = y
+    y -= 10 * mm
+    recs_header_y = y
+    y -= 7 * mm
+    return {
+        "canvas": canvas,
+        "pagesize": A4,
+        "height": height,
+        "x": 25 * mm,
+        "rec_x": 28 * mm,
+        "line": 6 * mm,
+        "bottom": 20 * mm,
+        "top": height - 25 * mm,
+        "title_y": title_y,
+        "student_y": student_y,
+        "record_y": record_y,
+        "inputs_header_y": inputs_header_y,
+        "input_rows": input_rows,
+        "grade_y": grade_y,
+        "recs_header_y": recs_header_y,
+        "recs_y": y,
+    }
+
+
+def generate_pdf(name: str, record_id: int, data: Dict[str, Any], grade: str, recommendations: List[str]) -> bytes:
+    # Generates a simple PDF using reportlab
+    layout = _static_layout()
+    if layout is None:
+        # Fallback simple text PDF via reportlab not available -> return a text-like PDF header to avoid crash
+        return b"%PDF-1.4\n% PDF generation requires 'reportlab' installed."
+
+    buf = io.BytesIO()
+    c = layout["canvas"].Canvas(buf, pagesize=layout["pagesize"])
+    x = layout["x"]
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(x, layout["title_y"], "Student Performance Report")
+
+    c.setFont("Helvetica", 11)
+    c.drawString(x, layout["student_y"], f"Student: {name}")
+    c.drawString(x, layout["record_y"], f"Record ID: {record_id}")
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(x, layout["inputs_header_y"], "Inputs")
+    c.setFont("Helvetica", 11)
+    for label, key, y in layout["input_rows"]:
+        c.drawString(x, y, f"{label}: {data[key]}")
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(x, layout["grade_y"], f"Predicted Grade: {grade}")
+    c.drawString(x, layout["recs_header_y"], "Recommendations")
+
+    c.setFont("Helvetica", 11)
+    y = layout["recs_y"]
+    if recommendations:
+        for r in recommendations:
+            c.drawString(layout["rec_x"], y, f"- {r}")
+            y -= layout["line"]
+            if y < layout["bottom"]:
+                c.showPage()
+                y = layout["top"]
+    else:
+        c.drawString(layout["rec_x"], y, "- Keep it up!")
+
+    c.showPage()
+    c.save()
+    buf.seek(0)
+    return buf.read()
+
+
+# Deferred rendering: PDFs are only built when asked for, on a worker pool, and cached
+_POOL: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+_CACHE: "OrderedDict[int, Tuple[str, bytes]]" = OrderedDict()
+_CACHE_BYTES = 0
+_PENDING: Dict[int, Tuple[str, Future]] = {}
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                # Workers pay the reportlab import and layout once, before the first request
+                _POOL = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf", initializer=_static_layout)
+    return _POOL
+
+
+def _signature(name: str, data: Dict[str, Any], grade: str, recommendations: List[str]) -> str:
+    # Cached PDFs are keyed by record id but must be re-rendered if the record changed
+    payload = repr((name, sorted(data.items()), grade, list(recommendations)))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _store(record_id: int, signature: str, pdf: bytes) -> None:
+    global _CACHE_BYTES
+    with _LOCK:
+        old = _CACHE.pop(record_id, None)
+        if old is not None:
+            _CACHE_BYTES -= len(old[1])
+        _CACHE[record_id] = (signature, pdf)
+        _CACHE_BYTES += len(pdf)
+        # Evict least recently used PDFs until the cache fits its byte budget
+        while _CACHE_BYTES > PDF_CACHE_MAX_BYTES and len(_CACHE) > 1:
+            _, (_, evicted) = _CACHE.popitem(last=False)
+            _CACHE_BYTES -= len(evicted)
+        pending = _PENDING.get(record_id)
+        if pending is not None and pending[0] == signature:
+            del _PENDING[record_id]
+
+
+def cached_pdf(record_id: int, name: str, data: Dict[str, Any], grade: str, recommendations: List[str]) -> Optional[bytes]:
+    signature = _signature(name, data, grade, recommendations)
+    with _LOCK:
+        entry = _CACHE.get(record_id)
+        if entry is not None and entry[0] == signature:
+            _CACHE.move_to_end(record_id)
+            return entry[1]
+    return None
+
+
+def request_pdf(record_id: int, name: str, data: Dict[str, Any], grade: str, recommendations: List[str]) -> "Future[bytes]":
+    """
+    Returns a Future for the record's PDF: already resolved if cached, otherwise
+    rendered on the worker pool. Does not block; concurrent requests for the same
+    record and content share one job.
+    """
+    signature = _signature(name, data, grade, recommendations)
+    pool = _get_pool()  # outside _LOCK, which _get_pool takes itself
+
+    def render() -> bytes:
+        pdf = generate_pdf(name=name, record_id=record_id, data=data, grade=grade, recommendations=recommendations)
+        _store(record_id, signature, pdf)
+        return pdf
+
+    # Lookup, submit and registration happen under one lock so two clicks cannot both submit
+    with _LOCK:
+        entry = _CACHE.get(record_id)
+        if entry is not None and entry[0] == signature:
+            _CACHE.move_to_end(record_id)
+            done: "Future[bytes]" = Future()
+            done.set_result(entry[1])
+            return done
+        pending = _PENDING.get(record_id)
+        if pending is not None and pending[0] == signature:
+            return pending[1]
+        future = pool.submit(render)
+        _PENDING[record_id] = (signature, future)
+    return future
+
+
+def benchmark_submit(n: int = 50) -> Dict[str, float]:
+    """
+    Times the student submit path (predict, recommendations, insert) against a scratch
+    database, with and without rendering the PDF inline as the dashboard used to.
+    """
+    import tempfile
+
+    import backend
+    import database
+
+    saved = database.DB_PATH
+    results: Dict[str, float] = {}
+    data = {"attendance": 85.0, "marks": 78.0, "assignments": 80.0, "study_hours": 12.0, "extracurriculars": 3.0}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_PATH = os.path.join(tmp, "bench.db")
+            backend.predict_grade(data)  # load the model outside the timings
+            _static_layout()
+            for mode, with_pdf in (("submit without PDF", False), ("submit with inline PDF", True)):
+                timings = []
+                for i in range(n):
+                    started = time.perf_counter()
+                    grade, _ = backend.predict_grade(data)
+                    recs = backend.get_recommendations(data)
+                    record_id = backend.add_student(f"bench{i}", **data, predicted_grade=grade)
+                    if with_pdf:
+                        generate_pdf(f"bench{i}", record_id, data, grade, recs)
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                results[f"{mode} (median ms)"] = round(timings[len(timings) // 2] * 1000, 2)
+                results[f"{mode} (p95 ms)"] = round(timings[int(len(timings) * 0.95) - 1] * 1000, 2)
+            database.close_writers()
+    finally:
+        database.DB_PATH = saved
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python reports.py", description="PDF report tools.")
+    parser.add_argument("--bench", type=int, default=50, metavar="N", help="Benchmark N submits with and without PDF.")
+    args = parser.parse_args()
+    for key, value in benchmark_submit(args.bench).items():
+        print(f"{key}: {value}")